@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+import os, sys, time, json, subprocess, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+## Lint latency: a fresh "mirv_preter.py file" process per request, the way an
+## editor plugin would run it without the daemon, vs "check" requests to one
+## "python -m mirv.daemon" process kept running on a pipe.  Each request edits one line.
+## usage: bench_daemon.py [requests] [definitions]
+
+here = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+definition = """
+def int count%(n)d = %(k)d;
+def proc step%(n)d (int x) = {
+	set count%(n)d = count%(n)d + x * %(n)d;
+}
+"""
+
+def source(definitions, k):
+	return "".join(definition % {"n": n, "k": k if n == definitions / 2 else 0} for n in xrange(definitions))
+
+def spawned(requests, definitions):
+	handle, path = tempfile.mkstemp(suffix = ".mirv")
+	os.close(handle)
+	try:
+		start = time.time()
+		for request in xrange(requests):
+			with open(path, "w") as file:
+				file.write(source(definitions, request))
+			subprocess.check_call([sys.executable, os.path.join(here, "mirv_preter.py"), path])
+		return (time.time() - start) / requests
+	finally:
+		os.unlink(path)
+
+def daemon(requests, definitions):
+	server = subprocess.Popen([sys.executable, "-m", "mirv.daemon"], cwd = here, stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+	def call(ident, method, **params):
+		server.stdin.write(json.dumps({"jsonrpc": "2.0", "id": ident, "method": method, "params": params}) + "\n")
+		server.stdin.flush()
+		return json.loads(server.stdout.readline())
+	call(0, "parse", uri = "robot.mirv", text = source(definitions, -1)) # opened in the editor
+	start = time.time()
+	for request in xrange(requests):
+		response = call(request + 1, "check", uri = "robot.mirv", text = source(definitions, request))
+		assert response["result"]["diagnostics"] == [], response
+	elapsed = (time.time() - start) / requests
+	call(requests + 1, "shutdown")
+	server.wait()
+	return elapsed
+
+if __name__ == "__main__":
+	requests    = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+	definitions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+	cold = spawned(requests, definitions)
+	warm = daemon(requests, definitions)
+	print "%d requests, %d definitions" % (requests, definitions * 2)
+	print "  process per request: %8.2f ms/request" % (cold * 1e3)
+	print "  daemon:              %8.2f ms/request" % (warm * 1e3)
+	print "  speedup: %7.2fx" % (cold / warm)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import runtime, bytecode
+
+## Per-tick latency: tree-walking runtime.Machine vs bytecode.BytecodeMachine.
+## The VM measures about 1.0-1.4x faster on this robot, and the figure is noisy:
+## the tree walker already has typed operator handlers, pooled frames and
+## compiled rpn, so most of what is left is call overhead both engines share.
+## usage: bench_engines.py [ticks] [repeats]
+
+robot = """
+def int ticks = 0;
+def real heading = 0;
+def func int fib (int n) = {
+	cond { (n < 2) { return n; } }
+	return apply fib(n - 1) + apply fib(n - 2);
+}
+def func real score (int x, int y) = {
+	let real s = 0;
+	let int i = 0;
+	while (i < 20) {
+		set s = s + (x * i) % 7 - (y + i) % 5;
+		set i = i + 1;
+	}
+	return s;
+}
+def proc _loop_ () = {
+	set ticks = ticks + 1;
+	set heading = apply score(ticks, 3) + apply fib(10);
+	rpn heading 2 * sin;
+	call push(apply pop() + 1);
+	call push(apply pop());
+	let int drop = apply pop();
+}
+"""
+
+def bench(machineClass, program, ticks, repeats):
+	best = None
+	for r in xrange(repeats):
+		machine = machineClass(program)
+		machine.start()
+		start = time.time()
+		for t in xrange(ticks):
+			machine.tick()
+		elapsed = time.time() - start
+		if best is None or elapsed < best: best = elapsed
+	return machine, best
+
+if __name__ == "__main__":
+	ticks   = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+	program = mirv.parse_string(robot)
+	tree, treeTime = bench(runtime.Machine,          program, ticks, repeats)
+	vm,   vmTime   = bench(bytecode.BytecodeMachine, program, ticks, repeats)
+	assert tree.globals.slots == vm.globals.slots, "engines disagree"
+	print "tree walker: %8.1f us/tick" % (treeTime / ticks * 1e6)
+	print "bytecode VM: %8.1f us/tick" % (vmTime / ticks * 1e6)
+	print "speedup:     %8.2fx" % (treeTime / vmTime)
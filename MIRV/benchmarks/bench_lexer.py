@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+import os, sys, re, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mirv import lexer
+
+## Micro-benchmark: tokens/second for keyword/operator/structure lookup.
+## "before" re-creates the original linear-scan callbacks; "after" uses the lookup tables.
+## "single-pass" runs lexer.tokenize over the whole buffer at once.
+## usage: bench_lexer.py [copies] [repeats]
+
+## Linear-Scan Reference (pre-table lexer) ##
+
+def scanLexeme (scanner, token):
+	for kw in lexer.keywords:
+		if kw == token: return kw.upper(), None
+	return "ID",   token
+
+def scanOperator (scanner, token):
+	if token == "=": return "ASSIGN", None
+	for op in lexer.prefixops:
+		if op[0] == token: return 'PREFIXOP', op[1]
+	for op in lexer.infixops:
+		if op[0] == token: return 'INFIXOP', op[1]
+
+def scanStruct (scanner, token):
+	for sym in lexer.structurers:
+		if sym[0] == token: return sym[1], None
+
+linearScanner = re.Scanner([
+    (lexer.relex,   scanLexeme),
+    (lexer.recomm,  None),
+    (lexer.reop,    scanOperator),
+    (lexer.renum,   lexer.number),
+    (lexer.restrc,  scanStruct),
+    (lexer.redstr,  lexer.string),
+    (lexer.resstr,  lexer.string),
+    (r"\s+",        None),
+    ])
+
+tableScanner = re.Scanner([
+    (lexer.relex,   lexer.lexeme),
+    (lexer.recomm,  None),
+    (lexer.reop,    lexer.operator),
+    (lexer.renum,   lexer.number),
+    (lexer.restrc,  lexer.struct),
+    (lexer.redstr,  lexer.string),
+    (lexer.resstr,  lexer.string),
+    (r"\s+",        None),
+    ])
+
+## Synthetic Corpus ##
+
+template = """def func real f%(n)d (int x, real y) = {
+	let int z%(n)d = 7;
+	set z%(n)d = x * 2 + (y - %(n)d) / 3.5 >> 1;
+	cond { (z%(n)d <= 10) { call _loop_(z%(n)d, @y = y); } }
+	while (z%(n)d > 0) { set z%(n)d = z%(n)d - 1; rpn x y + sin store; }
+	return apply sqrt(x * x + y * y) %% 'str%(n)d';
+}
+"""
+
+def corpus(copies):
+	lines = []
+	for n in xrange(copies):
+		lines.extend((template % {"n": n}).splitlines())
+	return [line.strip() for line in lines]
+
+def run(scanner, lines, repeats):
+	best = None
+	for r in xrange(repeats):
+		count = 0
+		start = time.time()
+		for line in lines:
+			tokens, remainder = scanner.scan(line)
+			count += len(tokens)
+		elapsed = time.time() - start
+		if best is None or elapsed < best: best = elapsed
+	return count, best
+
+def runSinglePass(buffer, repeats):
+	best = None
+	for r in xrange(repeats):
+		start = time.time()
+		count = sum(1 for token in lexer.tokenize(buffer))
+		elapsed = time.time() - start
+		if best is None or elapsed < best: best = elapsed
+	return count, best
+
+if __name__ == "__main__":
+	copies  = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+	lines = corpus(copies)
+	before = run(linearScanner, lines, repeats)
+	after  = run(tableScanner,  lines, repeats)
+	single = runSinglePass("\n".join(lines), repeats)
+	assert before[0] == after[0] == single[0], "scanners disagree on token count"
+	print "corpus: %d lines, %d tokens" % (len(lines), after[0])
+	print "before (linear scan): %10.0f tokens/s" % (before[0] / before[1])
+	print "after  (hash tables): %10.0f tokens/s" % (after[0] / after[1])
+	print "speedup:              %10.2fx" % (before[1] / after[1])
+	print "single-pass buffer:   %10.0f tokens/s" % (single[0] / single[1])
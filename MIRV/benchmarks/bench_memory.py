@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+import os, sys, types
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import node_classes
+
+## Bytes per AST node: the slotted node classes vs the dict-backed layout they replaced.
+## "before" rebuilds every node as an old-style instance with the same attributes
+## in a __dict__ (and Variable's empty properties dict); "after" is the parsed AST.
+## Only the node objects themselves are counted, not the values they point at.
+## usage: bench_memory.py [copies]
+
+robot = """
+def real hits%(n)d = 0;
+def real heading%(n)d = 1.5;
+def func real aim%(n)d (real x, real y, int n) = {
+	let real best = 0;
+	let int i = 0;
+	while (i < n) {
+		set best = best + apply atan2(y - i, x + i) * 2 - (i %% 3);
+		set i = i + 1;
+	}
+	cond { (best > 1) { return best; } (x < y) { return apply sqrt(x * x + y * y); } }
+	return heading%(n)d[0];
+}
+def proc step%(n)d (int k) = {
+	rpn k 2 * 1 + hits%(n)d + sin;
+	set hits%(n)d = hits%(n)d + apply aim%(n)d(1.0, @y = 2.0, k) + ++ k;
+	call push(prebind aim%(n)d(@n = 3));
+}
+"""
+
+slotted = [node_classes.Term, node_classes.Indexable, node_classes.Apply, node_classes.Prefix,
+           node_classes.Prebinding, node_classes.Name, node_classes.ActualParam, node_classes.Expression,
+           node_classes.OpElement, node_classes.RpnAtom, node_classes.FormalParam, node_classes.Variable]
+
+def nodes(program):
+	# every slotted node reachable from the program, once each
+	seen, found, todo = set(), [], [program]
+	while todo:
+		obj = todo.pop()
+		if id(obj) in seen: continue
+		seen.add(id(obj))
+		if type(obj) in slotted: found.append(obj)
+		if isinstance(obj, (list, tuple)): todo.extend(obj)
+		elif isinstance(obj, dict): todo.extend(obj.values())
+		elif isinstance(obj, (node_classes.Scope, node_classes.Block, node_classes.Program)) \
+		     or isinstance(obj, (node_classes.Statement, node_classes.Term, node_classes.Name,
+		                         node_classes.ActualParam, node_classes.OpElement,
+		                         node_classes.RpnAtom, node_classes.FormalParam)):
+			todo.extend(attributes(obj).values())
+	return found
+
+def attributes(obj):
+	ret = dict(getattr(obj, "__dict__", {}))
+	for cls in type(obj).__mro__:
+		for name in cls.__dict__.get("__slots__", ()):
+			if hasattr(obj, name): ret[name] = getattr(obj, name)
+	return ret
+
+def after(node):
+	size = sys.getsizeof(node)
+	if hasattr(node, "__dict__"): size += sys.getsizeof(node.__dict__)
+	if isinstance(node, node_classes.Variable) and node.properties is not None: size += sys.getsizeof(node.properties)
+	return size
+
+oldStyle = {}
+def before(node):
+	# the same attributes on an old-style instance, the way the classes used to be
+	cls = type(node)
+	if cls not in oldStyle: oldStyle[cls] = types.ClassType(cls.__name__, (), {})
+	twin = oldStyle[cls]()
+	twin.__dict__.update(attributes(node))
+	size = sys.getsizeof(twin) + sys.getsizeof(twin.__dict__)
+	if isinstance(node, node_classes.Variable): size += sys.getsizeof(dict()) # properties = dict()
+	return size
+
+if __name__ == "__main__":
+	copies = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	program = mirv.parse_string("".join(robot % {"n": n} for n in xrange(copies)))
+	found = nodes(program)
+	counts, old, new = {}, {}, {}
+	for node in found:
+		name = type(node).__name__
+		counts[name] = counts.get(name, 0) + 1
+		old[name] = old.get(name, 0) + before(node)
+		new[name] = new.get(name, 0) + after(node)
+	print "%-12s %8s %14s %14s" % ("class", "nodes", "before B/node", "after B/node")
+	for name in sorted(counts):
+		print "%-12s %8d %14.1f %14.1f" % (name, counts[name], old[name] / float(counts[name]), new[name] / float(counts[name]))
+	total, oldTotal, newTotal = len(found), sum(old.values()), sum(new.values())
+	print "%-12s %8d %14.1f %14.1f" % ("all", total, oldTotal / float(total), newTotal / float(total))
+	print "saved: %.1f%% (%d KiB)" % (100.0 * (oldTotal - newTotal) / oldTotal, (oldTotal - newTotal) / 1024)
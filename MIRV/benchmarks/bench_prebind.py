@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import os, sys, time, copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import runtime, bytecode
+
+## Cost of prebind: a Closure (shared Procedure + bound-value tuple) vs the
+## copy.copy-per-bound-parameter binding it replaced, reproduced here as copyBind.
+## Then ticks of a robot that builds and calls closures every tick, on both engines.
+## usage: bench_prebind.py [binds] [ticks]
+
+robot = """
+def int total = 0;
+def func int weigh (int a, int b, int c, int d) = { return a * b + c - d; }
+def func int twice (func f, int x) = { return apply f(apply f(x)); }
+def func int sweep (func f) = {
+	let int s = 0;
+	let int i = 0;
+	while (i < 10) { set s = s + apply f(i); set i = i + 1; }
+	return s;
+}
+def proc _loop_ () = {
+	let int i = 0;
+	while (i < 10) {
+		set total = total + apply twice(prebind weigh(i, 2, @d = 1), 0) + apply sweep(prebind weigh(@a = i, @b = 3, @c = 1));
+		set i = i + 1;
+	}
+}
+"""
+
+def copyBind(proc, names, values):
+	# the old Procedure.prebind: one shallow copy of the Procedure, and of its bound dict, per value
+	sub, bound = proc, {}
+	for name, value in zip(names, values):
+		if name is None:
+			for formal in proc.formalparams:
+				if formal.name not in bound: break
+			name = formal.name
+		for param in proc.formalparams:
+			if param.name == name: break
+		sub = copy.copy(sub)
+		bound = dict(bound)
+		bound[name] = runtime.widen(param.type, value)
+		sub.__dict__["bound"] = bound
+	return sub
+
+def perBind(bind, proc, binds):
+	names, values = [None, None, "d"], [1, 2, 3]
+	start = time.time()
+	for i in xrange(binds):
+		bind(proc, names, values)
+	return (time.time() - start) / binds
+
+def perTick(engine, program, ticks):
+	machine = engine(program)
+	machine.start()
+	start = time.time()
+	for tick in xrange(ticks):
+		machine.tick()
+	return (time.time() - start) / ticks, machine.globals.slots[0]
+
+if __name__ == "__main__":
+	binds = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+	program = mirv.parse_string(robot)
+	weigh = program.scope.lookup("weigh")
+	old = perBind(copyBind, weigh, binds)
+	new = perBind(lambda proc, names, values: proc.closure(names, values, None, None), weigh, binds)
+	print "prebind weigh(1, 2, @d = 3), %d times" % binds
+	print "  copy:    %8.2f us/bind, %4d bytes" % (old * 1e6, sys.getsizeof(copyBind(weigh, [None], [1]).__dict__))
+	closure = weigh.closure([None], [1], None, None)
+	print "  closure: %8.2f us/bind, %4d bytes" % (new * 1e6, sys.getsizeof(closure) + sys.getsizeof(closure.bound))
+	print "  speedup: %7.2fx" % (old / new)
+	results = []
+	for engine in (runtime.Machine, bytecode.BytecodeMachine):
+		elapsed, total = perTick(engine, program, ticks)
+		results.append(total)
+		print "%-16s %8.1f us/tick with 200 closures/tick" % (engine.__name__, elapsed * 1e6)
+	assert results[0] == results[1], "engines disagree"
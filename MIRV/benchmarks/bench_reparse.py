@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import incremental, runtime
+
+## Feedback per keystroke in a big script: parsing the whole edited source again
+## vs incremental.Document, which re-lexes the edited line and reparses only the
+## definition it falls in.  Each edit retypes one constant in the middle of the file.
+## usage: bench_reparse.py [definitions] [edits]
+
+header = """
+def int total = 0;
+def proc _loop_ () = { call step0(1); }
+"""
+
+definition = """
+def int count%(n)d = %(n)d;
+def func int weigh%(n)d (int a, int b) = {
+	let int s = 0;
+	let int i = 0;
+	while (i < a) { set s = s + i * b - %(k)d; set i = i + 1; }
+	return s;
+}
+def proc step%(n)d (int x) = {
+	set count%(n)d = count%(n)d + apply weigh%(n)d(x, 2);
+	set total = total + count%(n)d;
+}
+"""
+
+def source(definitions, k):
+	middle = definitions / 2
+	return header + "".join(definition % {"n": n, "k": k if n == middle else 1} for n in xrange(definitions))
+
+def bench(parse, definitions, edits):
+	start = time.time()
+	for edit in xrange(edits):
+		program = parse(source(definitions, edit + 2))
+	return (time.time() - start) / edits, program
+
+def tick(program):
+	machine = runtime.Machine(program)
+	machine.start()
+	machine.tick()
+	return list(machine.globals.slots)
+
+if __name__ == "__main__":
+	definitions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+	edits       = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+	document = incremental.Document()
+	document.update(source(definitions, 1))
+	full, expected = bench(mirv.parse_string, definitions, edits)
+	incr, program  = bench(document.update, definitions, edits)
+	assert tick(program) == tick(expected), "incremental parse disagrees"
+	print "%d definitions, %d lines; %d chunk(s) reparsed per edit" % (definitions * 3 + 2, source(definitions, 1).count("\n"), document.reparsed)
+	print "  full parse:  %8.2f ms/edit" % (full * 1e3)
+	print "  incremental: %8.2f ms/edit" % (incr * 1e3)
+	print "  speedup: %7.2fx" % (full / incr)
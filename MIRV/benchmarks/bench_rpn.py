@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import runtime, bytecode, node_classes
+from mirv.node_classes import RPN
+from mirv.runtime import ExecutionError
+
+## rpn statements: compiled to straight-line Python at load time (RPN.compile) vs
+## the atom-at-a-time interpreter they replaced, reproduced here as interpret().
+## Both run on the tree walker; the VM runs the same compiled code.
+## usage: bench_rpn.py [ticks]
+
+robot = """
+def real x = 1.5;
+def real y = 0.25;
+def real out = 0;
+def proc _loop_ () = {
+	let int i = 0;
+	while (i < 50) {
+		rpn x y * 2 + sin x y - cos * i 3 % + ;
+		rpn x x * y y * + sqrt 1 + atan ;
+		rpn + 2 / ;
+		set out = out + apply pop();
+		set i = i + 1;
+	}
+}
+"""
+
+def interpret(self, frame):
+	# the old RPN.execute, on the DataStack's push and pop
+	stack = frame.machine.stack
+	for atom in self.atoms:
+		kind, content = atom.type, atom.content
+		if kind == RPN.LITERAL:
+			stack.push(content)
+		elif kind == RPN.VAR:
+			stack.push(content.load(frame))
+		else:
+			if kind == RPN.INFIX:    arity = 2
+			elif kind == RPN.PREFIX: arity = 1
+			elif kind == RPN.OPKW:   arity = runtime.opkws[content][0]
+			else:                    arity = runtime.arities[content]
+			if len(stack) < arity: raise ExecutionError("stack underflow in rpn at \"" + str(content) + "\"")
+			args = [stack.pop() for n in xrange(arity)][::-1]
+			if kind == RPN.INFIX:    stack.push(runtime.infix(content, args[0], args[1]))
+			elif kind == RPN.PREFIX: stack.push(runtime.prefix(content, args[0]))
+			elif kind == RPN.OPKW:   stack.push(runtime.opkws[content][1](*args))
+			else:                    stack.push(runtime.functions[content](frame.machine, args))
+
+def bench(engine, program, ticks):
+	machine = engine(program)
+	machine.start()
+	start = time.time()
+	for tick in xrange(ticks):
+		machine.tick()
+	return (time.time() - start) / ticks, machine.globals.slots[2]
+
+if __name__ == "__main__":
+	ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	program = mirv.parse_string(robot)
+	compiled = RPN.execute
+	RPN.execute = interpret
+	old, expected = bench(runtime.Machine, program, ticks)
+	RPN.execute = compiled
+	new, result = bench(runtime.Machine, program, ticks)
+	vm, vmResult = bench(bytecode.BytecodeMachine, program, ticks)
+	assert result == expected == vmResult, "compiled rpn disagrees"
+	print "tree walker, interpreted rpn: %8.1f us/tick" % (old * 1e6)
+	print "tree walker, compiled rpn:    %8.1f us/tick" % (new * 1e6)
+	print "bytecode VM, compiled rpn:    %8.1f us/tick" % (vm * 1e6)
+	print "speedup: %.2fx" % (old / new)
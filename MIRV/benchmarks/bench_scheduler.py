@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import multiprocessing
+import mirv
+from mirv import runtime, bytecode, scheduler
+
+## Arena throughput: robot-ticks/second for many robots.
+## "one by one" calls machine.tick() per robot per tick, the way a game loop would
+## without the scheduler; then scheduler.Scheduler in-process and across processes.
+## Robots that leave prebound subroutines on their stacks are snapshot across processes
+## too, after they have run: the Closures come back through the workers' pipes.
+## usage: bench_scheduler.py [robots] [ticks] [processes]
+
+robot = """
+def int ticks = 0;
+def real x = %(n)d;
+def real y = 0;
+def func real steer (real a, real b) = {
+	let real s = 0;
+	let int i = 0;
+	while (i < 30) {
+		set s = s + a * i - b / (i + 1);
+		set i = i + 1;
+	}
+	return s;
+}
+def proc _init_ () = { set y = 1; }
+def proc _loop_ () = {
+	set ticks = ticks + 1;
+	set x = x + apply sin(apply steer(x, y)) / 100;
+	set y = y + apply cos(x) / 100;
+}
+"""
+
+closures = """
+def real r = 0;
+def func real scale (real k, real x) = { return k * x + apply sqrt(x); }
+def proc _loop_ () = {
+	set r = r + apply scale(1, 4);
+	call push(prebind scale(@k = 2));
+}
+"""
+
+def crossing(engine, ticks, processes):
+	programs = [mirv.parse_string(closures) for n in xrange(max(processes, 2))]
+	with scheduler.Scheduler(programs, engine, max(processes, 2)) as arena:
+		arena.start()
+		errors = arena.tick(ticks)
+		assert not any(errors), errors
+		for slots, stack in arena.snapshot():
+			assert [str(value) for value in stack] == ["prebound scale(k = 2.0)"] * ticks, stack
+
+def oneByOne(programs, engine, ticks):
+	machines = [engine(program) for program in programs]
+	for machine in machines:
+		machine.start()
+	start = time.time()
+	for tick in xrange(ticks):
+		for machine in machines:
+			machine.tick()
+	return time.time() - start, [(list(m.globals.slots), list(m.stack)) for m in machines]
+
+def scheduled(programs, engine, ticks, processes):
+	with scheduler.Scheduler(programs, engine, processes) as arena:
+		arena.start()
+		start = time.time()
+		errors = arena.tick(ticks)
+		elapsed = time.time() - start
+		assert not any(errors), errors
+		return elapsed, arena.snapshot()
+
+if __name__ == "__main__":
+	robots    = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	ticks     = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+	processes = int(sys.argv[3]) if len(sys.argv) > 3 else multiprocessing.cpu_count()
+	programs  = [mirv.parse_string(robot % {"n": n}) for n in xrange(robots)]
+	work = robots * ticks
+	for engine in (runtime.Machine, bytecode.BytecodeMachine):
+		base, expected = oneByOne(programs, engine, ticks)
+		local, state   = scheduled(programs, engine, ticks, None)
+		assert state == expected, "scheduler disagrees"
+		pool, state    = scheduled(programs, engine, ticks, processes)
+		assert state == expected, "process pool disagrees"
+		crossing(engine, ticks, processes)
+		print "%s, %d robots x %d ticks" % (engine.__name__, robots, ticks)
+		print "  one by one:        %10.0f robot-ticks/s" % (work / base)
+		print "  scheduler:         %10.0f robot-ticks/s" % (work / local)
+		print "  %2d processes:      %10.0f robot-ticks/s" % (processes, work / pool)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import runtime, bytecode
+
+## Passing board rows and blocks to a function: slices are views, so handing one
+## over costs a view object whatever its size; "copy" rebuilds each slice with
+## apply array() first, the way it would have to be done without them.
+## usage: bench_slices.py [rows] [cols] [ticks]
+
+robot = """
+def matrix board = apply matrix(%(rows)d, %(cols)d, 1);
+def real best = 0;
+def func real edges (array row) = {
+	return row[0] + row[%(cols)d - 1];
+}
+def func real corner (matrix block) = {
+	return block[0, 0];
+}
+def proc _loop_ () = {
+	let int i = 0;
+	while (i < %(rows)d) {
+		set best = best + apply edges(%(row)s) + apply corner(%(block)s);
+		set i = i + 1;
+	}
+}
+"""
+
+views  = {"row": "board[i]",                  "block": "board[i:, 1:]"}
+copies = {"row": "apply array(board[i])",     "block": "board[i:, 1:] + 0"}
+
+def bench(engine, program, ticks):
+	machine = engine(program)
+	machine.start()
+	start = time.time()
+	for tick in xrange(ticks):
+		machine.tick()
+	return (time.time() - start) / ticks, machine.globals.slots[1]
+
+if __name__ == "__main__":
+	rows  = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+	cols  = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+	ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+	shape = {"rows": rows, "cols": cols}
+	for engine in (runtime.Machine, bytecode.BytecodeMachine):
+		copy, expected = bench(engine, mirv.parse_string(robot % dict(shape, **copies)), ticks)
+		view, result   = bench(engine, mirv.parse_string(robot % dict(shape, **views)), ticks)
+		assert result == expected, "views disagree with copies"
+		print "%s, %d x %d board" % (engine.__name__, rows, cols)
+		print "  copy: %10.1f us/tick" % (copy * 1e6)
+		print "  view: %10.1f us/tick" % (view * 1e6)
+		print "  speedup: %7.2fx" % (copy / view)
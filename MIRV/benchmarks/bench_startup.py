@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+import os, sys, time, subprocess, tempfile
+
+## Cold start: fresh interpreters timed from launch to exit.  "import mirv" should
+## cost next to nothing over a bare interpreter (no I/O, no regex compilation, no
+## NumPy); compiling a small script from the command line has to come in under
+## budget_ms, or this exits 1.  "eager" imports what every start used to.
+## usage: bench_startup.py [runs] [budget_ms]
+
+here = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+robot = """
+def int ticks = 0;
+def real heading = 0;
+def func real turn (real by) = { return heading + by; }
+def proc _init_ () = { set heading = 90; }
+def proc _loop_ () = {
+	set ticks = ticks + 1;
+	cond { (ticks % 10 == 0) { set heading = apply turn(45); } }
+	rpn heading 360 % store;
+}
+"""
+
+eager = "import mirv, numpy; mirv.lexer.getMaster()"
+
+def best(command, runs):
+	times = []
+	for run in xrange(runs):
+		start = time.time()
+		subprocess.check_call(command, cwd = here)
+		times.append(time.time() - start)
+	return min(times)
+
+if __name__ == "__main__":
+	runs   = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+	budget = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+	handle, path = tempfile.mkstemp(suffix = ".mirv")
+	with os.fdopen(handle, "w") as file:
+		file.write(robot)
+	try:
+		bare    = best([sys.executable, "-c", "pass"], runs)
+		library = best([sys.executable, "-c", "import mirv"], runs)
+		before  = best([sys.executable, "-c", eager], runs)
+		compile = best([sys.executable, "-m", "mirv", path], runs)
+		run     = best([sys.executable, "-m", "mirv", "--run", "10", path], runs)
+	finally:
+		os.unlink(path)
+	print "best of %d runs" % runs
+	print "  bare interpreter:  %7.1f ms" % (bare * 1e3)
+	print "  import mirv:       %7.1f ms" % (library * 1e3)
+	print "  eager imports:     %7.1f ms" % (before * 1e3)
+	print "  compile a script:  %7.1f ms" % (compile * 1e3)
+	print "  and run 10 ticks:  %7.1f ms" % (run * 1e3)
+	if compile * 1e3 > budget:
+		print "OVER BUDGET: compiling took %.1f ms, budget %.1f ms" % (compile * 1e3, budget)
+		sys.exit(1)
+	print "within budget (%.1f ms)" % budget
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+import os, sys, gc, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import mirv
+from mirv import runtime, bytecode
+
+## Long tcall chains on both engines: two top-level procs tcalling each other, and
+## a proc tcalling one defined inside it, which tcalls back out -- so each hop's
+## caller frame is the callee's static link.  Either way a chain has to run in
+## constant stack: no Python recursion, no growing call records, a few live frames.
+## usage: bench_tcall.py [hops]
+
+robot = """
+def int hops = 0;
+def proc ping (int n) = { set hops = hops + 1; cond { (n > 0) { tcall pong(n - 1); } } }
+def proc pong (int n) = { set hops = hops + 1; tcall ping(n); }
+def proc outer (int n) = {
+	let proc inner () = { set hops = hops + 1; cond { (n > 0) { tcall outer(n - 1); } } }
+	set hops = hops + 1;
+	tcall inner();
+}
+def proc _loop_ () = { }
+"""
+
+def frames():
+	return len([o for o in gc.get_objects() if isinstance(o, runtime.Frame)])
+
+def bench(engine, program, name, hops):
+	machine = engine(program)
+	machine.start()
+	before = frames()
+	start = time.time()
+	machine.run(name, [hops])
+	elapsed = time.time() - start
+	assert machine.nesting == 0 and frames() - before <= 2, (machine.nesting, frames() - before)
+	return elapsed, list(machine.globals.slots)
+
+if __name__ == "__main__":
+	hops    = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	program = mirv.parse_string(robot)
+	for name in ("ping", "outer"):
+		tree, expected = bench(runtime.Machine,          program, name, hops)
+		vm,   state    = bench(bytecode.BytecodeMachine, program, name, hops)
+		assert state == expected, "engines disagree"
+		print "%s(%d): %d hops" % (name, hops, expected[0])
+		print "  tree walker: %8.3f us/hop" % (tree / expected[0] * 1e6)
+		print "  bytecode VM: %8.3f us/hop" % (vm / expected[0] * 1e6)
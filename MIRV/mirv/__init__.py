@@ -0,0 +1,13 @@
+## MIRV ##
+# The robot language as a library: parse a program, then run it on a
+# runtime.Machine (the tree walker) or a bytecode.BytecodeMachine.  Importing
+# it reads nothing and compiles no regular expressions -- the lexer builds its
+# patterns on first use, and NumPy is only imported once a program makes an
+# ARRAY or MATRIX.  The command line is mirv.cli (python -m mirv); the
+# scheduler, program cache, incremental parser and analysis daemon are
+# submodules, imported when wanted.
+
+from .parser import Parser, parse_string, parse_file, parse_stream
+from .diagnostics import Diagnostic, CompileError, setVerbosity
+from .runtime import Machine, ExecutionError
+from .bytecode import BytecodeMachine
@@ -0,0 +1,439 @@
+#!/usr/bin/env python
+import sys, array
+from . import runtime, node_classes
+from .runtime import ExecutionError
+from .node_classes import Procedure, Program, Closure, subroutines
+
+## Bytecode ##
+# A second execution engine.  Each subroutine is compiled once, on its first
+# call, to a flat array of (opcode, argument) pairs plus a constant table,
+# and one dispatch loop runs them.  The loop keeps its own call stack, so a
+# MIRV call costs a frame from the pool and a tuple, not a Python recursion.
+
+(CONST, LOAD, LOADG, LOADN, STORE, STOREG, STOREN, TOREAL,
+ ADD, SUB, MUL, LT, GT, EQ, BINOP, UNOP, INDEX,
+ ADDK, SUBK, MULK, LTK, GTK, EQK, BINFN,
+ JUMP, JUMPF, POP, CALL, TCALL, BUILTIN, PREBIND,
+ RETURN, END, HALT, RPN, SLICE, TUPLE, SETX) = range(38)
+
+opnames = ["CONST", "LOAD", "LOADG", "LOADN", "STORE", "STOREG", "STOREN", "TOREAL",
+           "ADD", "SUB", "MUL", "LT", "GT", "EQ", "BINOP", "UNOP", "INDEX",
+           "ADDK", "SUBK", "MULK", "LTK", "GTK", "EQK", "BINFN",
+           "JUMP", "JUMPF", "POP", "CALL", "TCALL", "BUILTIN", "PREBIND",
+           "RETURN", "END", "HALT", "RPN", "SLICE", "TUPLE", "SETX"]
+
+specialized = {'PLUS': ADD, 'MINUS': SUB, 'TIMES': MUL, 'LT': LT, 'GT': GT, 'EQ': EQ}
+withConst   = {ADD: ADDK, SUB: SUBK, MUL: MULK, LT: LTK, GT: GTK, EQ: EQK} # right operand is consts[arg]
+
+class Code:
+	def __init__(self, owner):
+		self.owner  = owner            # Procedure or Program
+		self.ops    = array.array('l') # opcode, argument, opcode, argument, ...
+		self.consts = []               # literals, Names, Sites
+		self.fetch  = None             # ops as a list: CPython indexes lists without boxing
+	def seal(self):
+		self.fetch = self.ops.tolist()
+		return self
+	def __str__(self):
+		return disassemble(self)
+
+class Site:
+	# what CALL, BUILTIN and PREBIND need beyond the argument values on the stack
+	def __init__(self, name, target, names, keep):
+		self.name   = name   # Identifier or KW, for messages
+		self.target = target # Name, or a builtin from runtime.functions/procedures
+		self.count  = len(names)
+		self.names  = names  # param names, None for positional
+		self.positional = not any(names)
+		self.keep   = keep   # push the result (apply) or drop it (call)
+
+def disassemble(code):
+	ret = "Code for " + str(getattr(code.owner, "name", "program")) + ":\n"
+	for pc in xrange(0, len(code.ops), 2):
+		op, arg = code.ops[pc], code.ops[pc + 1]
+		ret += "%4d %-8s %d\n" % (pc, opnames[op], arg)
+	return ret
+
+## Compiler ##
+
+class Compiler:
+	def __init__(self, owner):
+		self.code = Code(owner)
+	def emit(self, op, arg = 0):
+		self.code.ops.append(op)
+		self.code.ops.append(arg)
+		return len(self.code.ops) - 1 # where the argument went, for patching jumps
+	def here(self):
+		return len(self.code.ops)
+	def patch(self, at, target):
+		self.code.ops[at] = target
+	def const(self, value):
+		self.code.consts.append(value)
+		return len(self.code.consts) - 1
+	def compile(self, node):
+		getattr(self, "compile" + node.__class__.__name__)(node)
+
+	## Statements ##
+
+	def compileBlock(self, block):
+		for stmt in block.statements:
+			self.compile(stmt)
+			if isinstance(stmt, node_classes.Expression): self.emit(POP)
+
+	def compileVariable(self, var):
+		self.compile(var.init)
+		if var.type == "REAL": self.emit(TOREAL)
+		self.emit(STORE if var.owner is self.code.owner else STOREG, var.slot)
+
+	def compileCond(self, cond):
+		ends = []
+		for elem in cond.conds:
+			self.compile(elem.cond)
+			skip = self.emit(JUMPF)
+			self.compileBlock(elem.block)
+			ends.append(self.emit(JUMP))
+			self.patch(skip, self.here())
+		for end in ends:
+			self.patch(end, self.here())
+
+	def compileWhile(self, loop):
+		top = self.here()
+		self.compile(loop.cond)
+		done = self.emit(JUMPF)
+		self.compileBlock(loop.block)
+		self.emit(JUMP, top)
+		self.patch(done, self.here())
+
+	def compileSet(self, stmt):
+		self.compile(stmt.rvalue)
+		if stmt.index is None:
+			self.store(stmt.lvalue)
+		else:
+			self.compile(stmt.index)
+			self.emit(SETX, self.const(stmt.lvalue))
+
+	def compileRPN(self, rpn):
+		# already straight-line Python (see RPN.compile): one instruction runs it
+		self.emit(RPN, self.const(rpn.code or rpn.compile()))
+
+	def compileCall(self, call):
+		tail = call.tail and isinstance(self.code.owner, Procedure)
+		self.invoke(call, runtime.procedures, False, tail)
+		if tail and call.name in runtime.procedures: self.emit(END) # nothing to hand the frame to
+
+	def compileReturn(self, stmt):
+		self.compile(stmt.expr)
+		self.emit(RETURN)
+
+	## Expressions ##
+
+	def compileExpression(self, expr):
+		self.compile(expr.term)
+		for elem in expr.rest:
+			# inlined only for INT and REAL operands; anything else goes through
+			# infix, which checks its operands and runs arrays under errstate
+			op = specialized.get(elem.operator) if elem.typed else None
+			if op is not None and literal(elem.rest): # fold the CONST into the operator
+				self.emit(withConst[op], self.const(elem.rest.term.value))
+				continue
+			self.compile(elem.rest)
+			if op is not None: self.emit(op)
+			elif elem.typed: self.emit(BINFN, self.const(elem.handler)) # no dynamic check needed
+			else: self.emit(BINOP, self.const(elem.operator))
+
+	def compileTerm(self, term):
+		self.emit(CONST, self.const(term.value))
+
+	def compileName(self, name):
+		self.load(name)
+
+	def compileIndexable(self, term):
+		self.compile(term.value)
+		self.index(term)
+
+	def compileApply(self, term):
+		self.invoke(term, runtime.functions, True)
+		self.index(term)
+
+	def compilePrefix(self, term):
+		self.compile(term.expr)
+		self.emit(UNOP, self.const(term.operator))
+		self.index(term)
+
+	def compileSlice(self, index):
+		for end in (index.start, index.stop):
+			if end is None: self.emit(CONST, self.const(None))
+			else:           self.compile(end)
+		self.emit(SLICE)
+
+	def compileSubscripts(self, index):
+		for part in index.parts:
+			self.compile(part)
+		self.emit(TUPLE, len(index.parts))
+
+	def compilePrebinding(self, term):
+		for param in term.params:
+			self.compile(param.expr)
+		self.emit(PREBIND, self.const(Site(term.name, term.target, [param.name for param in term.params], True)))
+
+	## Helpers ##
+
+	def index(self, term):
+		if term.index is not None:
+			self.compile(term.index)
+			self.emit(INDEX)
+
+	def invoke(self, site, builtins, keep, tail = False):
+		for param in site.params:
+			self.compile(param.expr)
+		names = [param.name for param in site.params]
+		builtin = builtins.get(site.name)
+		if builtin is not None:
+			if any(names): raise ExecutionError(site.name + "() takes no named parameters")
+			self.emit(BUILTIN, self.const(Site(site.name, builtin, names, keep)))
+		else:
+			callee = site.callee if isinstance(site.callee, node_classes.Name) else node_classes.Name(site.name, site.scope)
+			self.emit(TCALL if tail else CALL, self.const(Site(site.name, callee, names, keep)))
+
+	def locate(self, name):
+		# (local slot, global slot, constant, or a Name to defer to) for this reference
+		try:
+			if name.depth is None: name.bind()
+		except ExecutionError: # undefined: stays an error, but only if it's reached
+			return "name", self.const(name)
+		if name.depth < 0:                            return "const", self.const(name.definition)
+		if name.depth == 0:                           return "local", name.slot
+		if isinstance(name.definition.owner, Program): return "global", name.slot
+		return "name", self.const(name)
+
+	def load(self, name):
+		where, arg = self.locate(name)
+		self.emit({"const": CONST, "local": LOAD, "global": LOADG, "name": LOADN}[where], arg)
+
+	def store(self, name):
+		where, arg = self.locate(name)
+		if where in ("local", "global") and name.definition.type == "REAL": self.emit(TOREAL)
+		if where == "local":    self.emit(STORE, arg)
+		elif where == "global": self.emit(STOREG, arg)
+		else:                   self.emit(STOREN, arg if where == "name" else self.const(name))
+
+def literal(expr):
+	return not expr.rest and expr.term.__class__ is node_classes.Term and expr.term.kind == node_classes.Term.LITERAL
+
+def compileProcedure(proc):
+	compiler = Compiler(proc)
+	compiler.compileBlock(proc.block)
+	compiler.emit(END)
+	proc.code = compiler.code.seal()
+	return proc.code
+
+def compileProgram(program):
+	compiler = Compiler(program)
+	compiler.compileBlock(program.block)
+	compiler.emit(HALT)
+	program.code = compiler.code.seal()
+	return program.code
+
+## Virtual Machine ##
+
+def execute(machine, proc, values = (), budget = None):
+	# run proc on the VM; values are positional params.  see loop() for budget
+	frame = proc.acquire(machine.globals)
+	try:
+		proc.bindValues(machine, frame, [None] * len(values), list(values))
+	except:
+		proc.release(frame)
+		raise
+	return loop(machine, proc.code or compileProcedure(proc), frame, budget)
+
+## Budgets ##
+# With a budget, loop() stops once it has run about that many instructions,
+# leaving machine.suspended = (code, pc, frame, operands, callers), and
+# resume() carries on from there with a fresh budget.  Instructions are
+# tallied only at the points where a run can go on indefinitely -- loop
+# back-edges and calls -- by how far pc moved since the last tally, so
+# straight-line code costs nothing extra (and a skipped branch counts as run).
+# Those are also the only places a run suspends.  A budget is at least
+# MIN_BUDGET: a run resumed at a call counts the call itself, and with less
+# it would suspend there again every time without getting anywhere.
+
+MIN_BUDGET = 2
+
+def resume(machine, budget = None):
+	code, pc, frame, stack, calls = machine.suspended
+	machine.suspended = None
+	return loop(machine, code, frame, budget, pc, stack, calls)
+
+def loop(machine, code, frame, budget = None, pc = 0, stack = None, calls = None):
+	ops, consts, slots = code.fetch, code.consts, frame.slots
+	if stack is None: stack = []  # operands
+	if calls is None: calls = []  # suspended callers: (code, pc, frame, keep)
+	push, pop = stack.append, stack.pop
+	truth = runtime.truth # an array is an error as a condition, whatever its size
+	MAX_NESTING = runtime.MAX_NESTING # calls in progress, as on the tree walker
+	globals = machine.globals.slots
+	limit = sys.maxint if budget is None else budget
+	steps, mark = 0, pc           # instructions tallied; pc at the last tally
+	try:
+		while True:
+			op = ops[pc]
+			arg = ops[pc + 1]
+			pc += 2
+			if op == LOAD:
+				push(slots[arg])
+			elif op == CONST:
+				push(consts[arg])
+			elif op == STORE:
+				slots[arg] = pop()
+			elif op == ADDK:
+				stack[-1] = stack[-1] + consts[arg]
+			elif op == SUBK:
+				stack[-1] = stack[-1] - consts[arg]
+			elif op == LTK:
+				stack[-1] = int(stack[-1] < consts[arg])
+			elif op == JUMPF:
+				if not truth(pop()): pc = arg
+			elif op == JUMP:
+				if arg < pc: # loop back-edge
+					steps += (pc - mark) >> 1
+					mark = arg
+					if steps >= limit:
+						machine.suspended, machine.steps = (code, arg, frame, stack, calls), steps
+						return None
+				pc = arg
+			elif op == ADD:
+				b = pop(); stack[-1] = stack[-1] + b
+			elif op == SUB:
+				b = pop(); stack[-1] = stack[-1] - b
+			elif op == MUL:
+				b = pop(); stack[-1] = stack[-1] * b
+			elif op == LT:
+				b = pop(); stack[-1] = int(stack[-1] < b)
+			elif op == GT:
+				b = pop(); stack[-1] = int(stack[-1] > b)
+			elif op == EQ:
+				b = pop(); stack[-1] = int(stack[-1] == b)
+			elif op == MULK:
+				stack[-1] = stack[-1] * consts[arg]
+			elif op == GTK:
+				stack[-1] = int(stack[-1] > consts[arg])
+			elif op == EQK:
+				stack[-1] = int(stack[-1] == consts[arg])
+			elif op == LOADG:
+				push(globals[arg])
+			elif op == STOREG:
+				globals[arg] = pop()
+			elif op == CALL or op == TCALL:
+				steps += (pc - mark) >> 1
+				mark = pc
+				if steps >= limit: # suspend before the call: its arguments are still on the stack
+					machine.suspended, machine.steps = (code, pc - 2, frame, stack, calls), steps
+					return None
+				site = consts[arg]
+				sub, bound, link = site.target.load(frame), None, None
+				if sub.__class__ is Closure: sub, bound, link = sub.procedure, sub.bound, sub.link
+				elif not isinstance(sub, Procedure): raise ExecutionError("\"" + site.name + "\" is not a subroutine")
+				keep = site.keep
+				if op == CALL:
+					if machine.nesting >= MAX_NESTING: raise node_classes.tooDeep(site.name, site.target)
+					callee = sub.acquire(frame, link)
+				else: # the callee takes over this frame's place, and its caller gets the result
+					callee = frame = sub.handoff(frame, link)
+				formals = sub.formalparams
+				if site.positional and bound is None and site.count == len(formals):
+					widen, cslots = runtime.widen, callee.slots # fast path: plain positional call
+					for formal in reversed(formals):
+						cslots[formal.slot] = widen(formal.type, pop())
+				else:
+					values = stack[len(stack) - site.count:]
+					del stack[len(stack) - site.count:]
+					try:
+						sub.bindValues(machine, callee, site.names, values, bound)
+					except:
+						if callee is not frame: sub.release(callee)
+						raise
+				if callee is not frame: calls.append((code, pc, frame, keep))
+				code = sub.code or compileProcedure(sub)
+				ops, consts, slots, frame, pc, mark = code.fetch, code.consts, callee.slots, callee, 0, 0
+			elif op == RETURN or op == END:
+				steps += (pc - mark) >> 1
+				result = pop() if op == RETURN else None
+				frame.owner.release(frame)
+				if not calls:
+					machine.steps = steps
+					return result
+				code, pc, frame, keep = calls.pop()
+				ops, consts, slots, mark = code.fetch, code.consts, frame.slots, pc
+				if keep: push(result)
+			elif op == POP:
+				pop()
+			elif op == BINFN:
+				b = pop(); stack[-1] = consts[arg](stack[-1], b)
+			elif op == BINOP:
+				b = pop(); stack[-1] = runtime.infix(consts[arg], stack[-1], b)
+			elif op == UNOP:
+				stack[-1] = runtime.prefix(consts[arg], stack[-1])
+			elif op == TOREAL:
+				if isinstance(stack[-1], (int, long)): stack[-1] = float(stack[-1])
+			elif op == BUILTIN:
+				site = consts[arg]
+				values = stack[len(stack) - site.count:]
+				del stack[len(stack) - site.count:]
+				result = site.target(machine, values)
+				if site.keep: push(result)
+			elif op == INDEX:
+				idx = pop(); stack[-1] = runtime.index(stack[-1], idx)
+			elif op == SLICE:
+				stop = pop(); stack[-1] = slice(stack[-1], stop)
+			elif op == TUPLE:
+				key = tuple(stack[len(stack) - arg:])
+				del stack[len(stack) - arg:]
+				push(key)
+			elif op == SETX:
+				key = pop(); consts[arg].update(frame, key, pop())
+			elif op == LOADN:
+				push(consts[arg].load(frame))
+			elif op == STOREN:
+				consts[arg].store(frame, pop())
+			elif op == RPN:
+				consts[arg](frame)
+			elif op == PREBIND:
+				site = consts[arg]
+				values = stack[len(stack) - site.count:]
+				del stack[len(stack) - site.count:]
+				sub = site.target.load(frame)
+				if not isinstance(sub, subroutines): raise ExecutionError("cannot prebind \"" + site.name + "\": not a subroutine")
+				push(sub.prebind(frame, site.names, values))
+			elif op == HALT:
+				return None
+			else:
+				raise ExecutionError("bad opcode " + str(op))
+	except (TypeError, ValueError, OverflowError) as e: # from the inlined operators, e.g. "a" - 1
+		release(frame, calls, machine)
+		raise ExecutionError(str(e)) # worded as the tree walker words it
+	except:
+		release(frame, calls, machine)
+		raise
+
+def release(frame, calls, machine):
+	# hand every live frame back to its pool when a run dies part-way
+	for call in calls + [(None, None, frame, None)]:
+		if call[2] is not machine.globals: call[2].owner.release(call[2])
+
+class BytecodeMachine(runtime.Machine):
+	# a Machine that runs its robot on the VM instead of walking the tree
+	def __init__(self, program, budget = None, capacity = None):
+		if budget is not None and budget < MIN_BUDGET: raise ValueError("budget must be at least %d instructions, got %r" % (MIN_BUDGET, budget))
+		runtime.Machine.__init__(self, program, capacity)
+		self.budget    = budget # instructions per tick (or per run); None for no limit
+		self.suspended = None   # where a run that used up its budget stopped
+		self.steps     = 0      # instructions the last run or tick used
+	def initialize(self):
+		loop(self, self.program.code or compileProgram(self.program), self.globals)
+	def call(self, proc, values):
+		if self.suspended is not None: raise ExecutionError("cannot call " + proc.name + "(): a suspended run must finish first")
+		return execute(self, proc, values, self.budget)
+	def tick(self):
+		# a suspended run takes the next tick, rather than starting _loop_ over
+		if self.suspended is not None: return resume(self, self.budget)
+		return runtime.Machine.tick(self)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+import os, hashlib
+import cPickle as pickle
+from .diagnostics import log
+
+## Program Cache ##
+# Parsed Programs pickled to disk, one file per source text.  The key is a
+# hash of the source plus the compiler version and options, so any change to
+# either misses.  Bytecode is never stored: the VM compiles on first call, and
+# a freshly parsed Program has none yet.  A hit refreshes the entry's mtime;
+# when the directory grows past its limit the stalest entries go first.
+
+VERSION = "mirv-ast-8" # bump whenever the parser, optimizer or AST classes change what they build
+
+class ProgramCache:
+	def __init__(self, directory, limit = 32 * 1024 * 1024):
+		self.directory = directory
+		self.limit     = limit # bytes on disk before eviction kicks in
+	def key(self, source, optimize = True):
+		return hashlib.sha1("%s\0%d\0%s" % (VERSION, optimize, source)).hexdigest()
+	def path(self, key):
+		return os.path.join(self.directory, key + ".ast")
+	def load(self, key):
+		# the cached Program, or None
+		path = self.path(key)
+		try:
+			with open(path, "rb") as file:
+				program = pickle.load(file)
+		except IOError:
+			return None
+		except Exception as e: # truncated or from an older layout: drop it and reparse
+			log.info("discarding bad cache entry %s: %s", path, e)
+			self.discard(path)
+			return None
+		try:
+			os.utime(path, None) # most recently used
+		except OSError:
+			pass
+		log.info("cache hit: %s", key)
+		return program
+	def store(self, key, program):
+		# written to a temporary file and renamed in, so readers never see half an entry
+		import tempfile # only needed on a miss; it's slow to import, and the command line imports us
+		if not os.path.isdir(self.directory): os.makedirs(self.directory)
+		handle, temp = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+		try:
+			with os.fdopen(handle, "wb") as file:
+				pickle.dump(program, file, pickle.HIGHEST_PROTOCOL)
+			os.rename(temp, self.path(key))
+		except:
+			self.discard(temp)
+			raise
+		self.evict(self.path(key))
+	def evict(self, keep = None):
+		entries = []
+		for name in os.listdir(self.directory):
+			path = os.path.join(self.directory, name)
+			if not name.endswith(".ast") or path == keep: continue
+			try:
+				stat = os.stat(path)
+			except OSError:
+				continue # evicted by someone else meanwhile
+			entries.append((stat.st_mtime, stat.st_size, path))
+		total = sum(entry[1] for entry in entries) + (os.path.getsize(keep) if keep else 0)
+		for mtime, size, path in sorted(entries):
+			if total <= self.limit: break
+			log.info("cache evict: %s", path)
+			self.discard(path)
+			total -= size
+	def discard(self, path):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+	def parse(self, source, parser):
+		# parser.parse_string(source), unless an earlier run already did
+		key = self.key(source, parser.optimize)
+		program = self.load(key)
+		if program is None:
+			program = parser.parse_string(source) # CompileErrors propagate, and aren't cached
+			try:
+				self.store(key, program)
+			except (IOError, OSError, pickle.PicklingError) as e:
+				log.warning("could not cache program: %s", e)
+		return program
+
+def defaultDirectory():
+	return os.environ.get("MIRV_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "mirv")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+import sys, argparse
+from . import diagnostics, runtime, bytecode, cache
+from .parser import Parser, parse_file, parse_stream
+from .diagnostics import log
+
+## Command Line ##
+# python -m mirv, or mirv_preter.py: parse each file (or stdin), reporting
+# errors, and optionally run them.  Nothing here happens on import.
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description = "Parse MIRV programs from files, or from stdin.")
+	argparser.add_argument("files", nargs = "*", help = "source files (default: stdin)")
+	argparser.add_argument("-r", "--run", type = int, metavar = "TICKS",
+	                       help = "execute each program: _init_, then _loop_ TICKS times")
+	argparser.add_argument("--vm", action = "store_true",
+	                       help = "run on the bytecode VM instead of the tree walker")
+	argparser.add_argument("--budget", type = int, metavar = "N",
+	                       help = "run on the VM, suspending each robot after about N instructions a tick")
+	argparser.add_argument("--stack", type = int, metavar = "N",
+	                       help = "give each robot a data stack of N values (default: %d)" % runtime.STACK_CAPACITY)
+	argparser.add_argument("-a", "--arena", action = "store_true",
+	                       help = "with --run, run all the programs together, a tick at a time")
+	argparser.add_argument("-j", "--jobs", type = int, metavar = "N",
+	                       help = "with --arena, spread the robots over N processes")
+	argparser.add_argument("--cache", nargs = "?", const = cache.defaultDirectory(), metavar = "DIR",
+	                       help = "reuse parsed programs stored in DIR (default: $MIRV_CACHE or ~/.cache/mirv)")
+	argparser.add_argument("-v", "--verbose", action = "count", default = 0,
+	                       help = "errors are always shown; -vv adds definitions and AST, -vvv every line")
+	args = argparser.parse_args(argv)
+	if args.budget is not None and args.budget < bytecode.MIN_BUDGET:
+		argparser.error("--budget must be at least %d" % bytecode.MIN_BUDGET)
+	diagnostics.setVerbosity(max(diagnostics.ERRORS, args.verbose)) # the library is quiet by default; the command line isn't
+	programs = cache.ProgramCache(args.cache) if args.cache else None
+	engine, options = runtime.Machine, {}
+	if args.vm or args.budget is not None: engine, options = bytecode.BytecodeMachine, {"budget": args.budget}
+	if args.stack is not None: options["capacity"] = args.stack
+	arena = [] # (path, Program), for --arena
+	status = 0
+	for path in args.files or [None]:
+		try:
+			if programs is not None:
+				if path is None: source = sys.stdin.read()
+				else:
+					with open(path, "rb") as file: source = file.read()
+				ast = programs.parse(source, Parser())
+			else:
+				ast = parse_stream(sys.stdin) if path is None else parse_file(path)
+			log.info("\n\n%s", ast)
+			if args.arena:
+				arena.append((path or "<stdin>", ast))
+			elif args.run is not None:
+				machine = ast.execute(engine(ast, **options))
+				for tick in xrange(args.run):
+					machine.tick()
+				log.info("stack: %s", machine.stack)
+		except diagnostics.CompileError as e: # already logged; keep going with the next file
+			status = 1
+		except runtime.ExecutionError as e:
+			log.error("ERROR: %s", e)
+			status = 1
+	if arena and args.run is not None:
+		from . import scheduler # and multiprocessing with it: only worth importing for an arena
+		with scheduler.Scheduler([program for name, program in arena], engine, args.jobs, **options) as robots:
+			robots.start()
+			errors = robots.tick(args.run)
+			for (path, ast), error, (slots, stack) in zip(arena, errors, robots.snapshot()):
+				if error is not None:
+					log.error("ERROR: %s: %s", path, error)
+					status = 1
+				log.info("%s stack: %s", path, stack)
+	return status
+
+if __name__ == "__main__":
+	sys.exit(main())
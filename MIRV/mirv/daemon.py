@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+import sys, os, socket, argparse, json, inspect, traceback
+from . import incremental, diagnostics
+from .node_classes import Procedure, Function
+
+## Analysis Daemon ##
+# A long-running process for editors and linters (python -m mirv.daemon), so a
+# request doesn't pay for starting Python and importing the compiler.  It speaks JSON-RPC 2.0, one
+# request or response per line, on stdin/stdout or on a Unix socket, and
+# keeps an incremental.Document per open file: a "parse" reparses only what
+# the new text changed, and "check" and "symbols" answer from memory.
+#
+#   parse    {uri, text}   -> {diagnostics, reparsed}
+#   check    {uri[, text]} -> {diagnostics}
+#   symbols  {uri}         -> [{name, kind, type, params, line}]
+#   close    {uri}         -> null
+#   shutdown               -> null, then the daemon exits
+#
+# A diagnostic is {line, column, message}; line and column may be null.
+
+PARSE_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, INVALID_PARAMS, INTERNAL_ERROR = -32700, -32600, -32601, -32602, -32603
+
+class RequestError(Exception):
+	def __init__(self, code, message):
+		Exception.__init__(self, message)
+		self.code = code
+
+class Session:
+	def __init__(self, optimize = True):
+		self.optimize  = optimize
+		self.documents = {} # uri -> incremental.Document
+		self.problems  = {} # uri -> diagnostics from the last parse
+		self.done      = False
+
+	def document(self, uri):
+		if uri not in self.documents: raise RequestError(INVALID_PARAMS, "no such document: " + str(uri))
+		return self.documents[uri]
+
+	## Methods ##
+
+	def parse(self, uri, text):
+		if not isinstance(text, basestring): raise RequestError(INVALID_PARAMS, "text must be a string")
+		if isinstance(text, unicode): text = text.encode("utf-8") # as if read from a file
+		document = self.documents.get(uri)
+		if document is None: document = self.documents[uri] = incremental.Document(self.optimize)
+		try:
+			document.update(text)
+			self.problems[uri] = []
+		except diagnostics.CompileError as e:
+			self.problems[uri] = [{"line": diag.line, "column": diag.column, "message": diag.message} for diag in e.diagnostics]
+		return {"diagnostics": self.problems[uri], "reparsed": document.reparsed}
+
+	def check(self, uri, text = None):
+		if text is not None: self.parse(uri, text)
+		self.document(uri)
+		return {"diagnostics": self.problems[uri]}
+
+	def symbols(self, uri):
+		ret = []
+		for chunk in self.document(uri).chunks:
+			for defn in chunk.definitions:
+				ret.append(symbol(defn, chunk.first[0] + 1))
+		return ret
+
+	def close(self, uri):
+		self.document(uri)
+		del self.documents[uri], self.problems[uri]
+
+	def shutdown(self):
+		self.done = True
+
+	methods = {"parse": parse, "check": check, "symbols": symbols, "close": close, "shutdown": shutdown}
+
+	## Protocol ##
+
+	def handle(self, line):
+		# the response to one line of JSON, or None for a notification
+		ident = None
+		try:
+			try:
+				request = json.loads(line)
+			except ValueError as e:
+				raise RequestError(PARSE_ERROR, "parse error: " + str(e))
+			if not isinstance(request, dict) or not isinstance(request.get("method"), basestring):
+				raise RequestError(INVALID_REQUEST, "invalid request")
+			ident = request.get("id")
+			method = self.methods.get(request["method"])
+			if method is None: raise RequestError(METHOD_NOT_FOUND, "no such method: " + request["method"])
+			params = request.get("params", {})
+			if isinstance(params, dict): args, kwargs = (), dict((str(k), v) for k, v in params.items())
+			elif isinstance(params, list): args, kwargs = tuple(params), {}
+			else: raise RequestError(INVALID_PARAMS, "params must be an object or an array")
+			try:
+				inspect.getcallargs(method, self, *args, **kwargs)
+			except TypeError as e:
+				raise RequestError(INVALID_PARAMS, str(e))
+			result = method(self, *args, **kwargs)
+			if "id" not in request: return None
+			return {"jsonrpc": "2.0", "id": ident, "result": result}
+		except RequestError as e:
+			return {"jsonrpc": "2.0", "id": ident, "error": {"code": e.code, "message": str(e)}}
+		except Exception as e: # a bug; keep serving the others
+			diagnostics.log.error("ERROR: %s", traceback.format_exc())
+			return {"jsonrpc": "2.0", "id": ident, "error": {"code": INTERNAL_ERROR, "message": "%s: %s" % (type(e).__name__, e)}}
+
+	def serve(self, input, output):
+		# one connection's requests, until it closes or asks us to shut down
+		for line in iter(input.readline, ""):
+			if not line.strip(): continue
+			response = self.handle(line)
+			if response is not None:
+				output.write(json.dumps(response) + "\n")
+				output.flush()
+			if self.done: break
+
+def symbol(defn, line):
+	# line is where its top-level definition starts
+	if isinstance(defn, Procedure):
+		kind = "func" if isinstance(defn, Function) else "proc"
+		type = defn.returnType if isinstance(defn, Function) else None
+		params = [[param.type, param.name] for param in defn.formalparams]
+	else:
+		kind, type, params = "var", defn.type, None
+	return {"name": defn.name, "kind": kind, "type": type, "params": params, "line": line}
+
+def listen(session, path):
+	# one client at a time, so documents never see two requests at once
+	if os.path.exists(path): os.unlink(path) # left over from a daemon that died
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		server.bind(path)
+		server.listen(5)
+		while not session.done:
+			conn, address = server.accept()
+			stream = conn.makefile("rwb")
+			try:
+				session.serve(stream, stream)
+			except socket.error as e: # client went away mid-response
+				diagnostics.log.info("connection dropped: %s", e)
+			finally:
+				stream.close()
+				conn.close()
+	finally:
+		server.close()
+		os.unlink(path)
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description = "Answer parse, check and symbol requests for MIRV programs, as JSON-RPC.")
+	argparser.add_argument("--socket", metavar = "PATH",
+	                       help = "listen on a Unix socket at PATH (default: stdin and stdout)")
+	argparser.add_argument("-v", "--verbose", action = "count", default = 0,
+	                       help = "log to stderr: -v errors, -vv more")
+	args = argparser.parse_args(argv)
+	diagnostics.setVerbosity(args.verbose)
+	session = Session()
+	if args.socket: listen(session, args.socket)
+	else: session.serve(sys.stdin, sys.stdout)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
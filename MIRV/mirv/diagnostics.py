@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+import sys, logging
+
+## Diagnostics ##
+# Everything the lexer, parser and AST classes used to print goes through the
+# "mirv" logger.  It is silent by default -- no handler output and no string
+# building -- until a caller opts in with setVerbosity().
+
+QUIET, ERRORS, INFO, DEBUG = range(4)
+levels = {QUIET: logging.CRITICAL + 1, ERRORS: logging.WARNING, INFO: logging.INFO, DEBUG: logging.DEBUG}
+
+log = logging.getLogger("mirv")
+log.addHandler(logging.NullHandler())
+log.setLevel(levels[QUIET])
+log.propagate = False # don't leak into an embedding application's root handlers
+
+console = None
+
+def setVerbosity(verbosity, stream = None):
+	# 0: silent, 1: errors, 2: definitions and AST dump, 3: every source line and comment
+	global console
+	verbosity = max(QUIET, min(DEBUG, verbosity))
+	log.setLevel(levels[verbosity])
+	if console is not None:
+		log.removeHandler(console)
+		console = None
+	if verbosity > QUIET:
+		console = logging.StreamHandler(stream or sys.stderr)
+		console.setFormatter(logging.Formatter("%(message)s"))
+		log.addHandler(console)
+
+def debugging():
+	# hoist this out of hot loops instead of calling log.debug per item
+	return log.isEnabledFor(logging.DEBUG)
+
+## Error Reporting ##
+
+class Diagnostic:
+	def __init__(self, message, line = None, column = None):
+		self.message = message
+		self.line    = line   # None when the position is unknown (e.g. end-of-file)
+		self.column  = column
+	def __str__(self):
+		if self.line is None: return self.message
+		if self.column is None: return "Line %d: %s" % (self.line, self.message)
+		return "Line %d, column %d: %s" % (self.line, self.column, self.message)
+
+class CompileError(Exception):
+	# raised once per compile, after recovery, carrying every diagnostic found
+	def __init__(self, diagnostics):
+		Exception.__init__(self, "%d error(s)" % len(diagnostics))
+		self.diagnostics = diagnostics
+	def __str__(self):
+		return "\n".join([Exception.__str__(self)] + [str(diag) for diag in self.diagnostics])
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+from . import lexer, node_classes, diagnostics, resolver, typechecker, optimizer
+from .node_classes import Variable, walkSubroutines
+from .diagnostics import Diagnostic, log
+from .parser import Parser, scopes
+
+## Incremental Parsing ##
+# For an editor that reparses on every keystroke.  A Document keeps the
+# source's tokens line by line, and the Program cut into its top-level
+# definitions ("chunks": a scope keyword outside any braces starts one).
+# An edit re-lexes only the lines it touches and reparses only the chunks
+# whose tokens lie on them; every other chunk keeps its subtree --
+# Functions, Procedures, Variables and all -- in the same Program, with
+# its Names' line numbers moved along if lines came or went above it.
+# Resolving, type checking and optimizing go a chunk at a time too: each
+# chunk keeps its results until a global it names (its "uses") is redefined
+# or moves to another slot, since an edit to one definition can break a
+# reference in another.  The Program is updated in place, so don't keep
+# running it across edits.
+
+class Chunk:
+	# one top-level definition, or the run of tokens panic mode made of it
+	def __init__(self, first, last):
+		self.first = first # (line, token) of its first token, lines counted from 0
+		self.last  = last  # (line, token) of its last token
+		self.block = node_classes.Block() # its global variables, in source order
+		self.definitions = [] # what it added to the program scope
+		self.refs  = []    # every Name and Variable the parser built for it
+		self.uses  = set() # the names of those, and of its definitions
+		self.clean = False # parsed without errors, so it can be kept
+		self.resolved  = None # resolver Diagnostics, until something it uses changes
+		self.checked   = None # type checker Diagnostics, likewise
+		self.optimized = False
+	def move(self, shift):
+		self.first = (self.first[0] + shift, self.first[1])
+		self.last  = (self.last[0] + shift, self.last[1])
+		for ref in self.refs:
+			if ref.line is not None: ref.line += shift
+		self.resolved = moved(self.resolved, shift)
+		self.checked  = moved(self.checked, shift)
+	def forget(self):
+		# to be resolved and checked again, and its bytecode compiled again
+		self.resolved = self.checked = None
+		for sub in walkSubroutines(self.definitions):
+			sub.code = None
+
+class Document:
+	def __init__(self, optimize = True):
+		self.parser  = Parser(optimize)
+		self.program = node_classes.Program()
+		self.lines   = [] # (text, tokens, lexer Diagnostics) per source line; tokens as lexed from the line alone
+		self.chunks  = [] # Chunk, in source order
+		self.reparsed = 0 # chunks parsed by the last edit, for the curious
+
+	def update(self, text):
+		# the Program for the whole new source text, raising CompileError like Parser.parse
+		old = [line[0] for line in self.lines]
+		new = text.split("\n")
+		first, limit = 0, min(len(old), len(new))
+		while first < limit and old[first] == new[first]:
+			first += 1
+		last = 0 # lines in common at the end, not overlapping those at the start
+		while last < limit - first and old[-1 - last] == new[-1 - last]:
+			last += 1
+		return self.edit(first, len(old) - last, new[first:len(new) - last])
+
+	def edit(self, first, stop, lines):
+		# replaces source lines first to stop (counted from 0, stop excluded) with lines
+		shift = len(lines) - (stop - first)
+		end = first + len(lines) # the new lines, in the new numbering
+		self.lines[first:stop] = [lex(text) for text in lines]
+		kept = dict(((chunk.first, chunk.last), chunk) for chunk in self.chunks if chunk.clean)
+		chunks = []
+		for span in self.spans():
+			(line, token), (lastLine, lastToken) = span
+			chunk = None
+			if lastLine < first: # wholly above the edit
+				chunk = kept.pop(span, None)
+			elif line >= end:    # wholly below it
+				chunk = kept.pop(((line - shift, token), (lastLine - shift, lastToken)), None)
+				if chunk is not None and shift: chunk.move(shift)
+			chunks.append(chunk or Chunk(*span))
+		program, parser = self.program, self.parser
+		del parser.errors[:]
+		for number, (text, tokens, errors) in enumerate(self.lines):
+			for diag in errors:
+				parser.errors.append(Diagnostic(diag.message, number + 1, diag.column))
+		definitions = program.scope.definitions
+		old = dict(definitions)
+		definitions.clear() # and filled again in source order, so a redefinition is reported where a full parse would
+		self.reparsed = 0
+		for i, chunk in enumerate(chunks):
+			if chunk.clean and not any(defn.name in definitions for defn in chunk.definitions): # kept
+				for defn in chunk.definitions:
+					definitions[defn.name] = defn
+				continue
+			until = chunks[i + 1].first if i + 1 < len(chunks) else None
+			self.parse(chunk, until)
+			self.reparsed += 1
+		self.chunks = chunks
+		changed = set(name for name in set(old) | set(definitions) if old.get(name) is not definitions.get(name))
+		program.frameSize = 0 # renumbered in source order, as a full parse would have them
+		for chunk in chunks:
+			for var in sorted([defn for defn in chunk.definitions if isinstance(defn, Variable)], key = lambda var: var.slot):
+				slot = program.allocate()
+				if var.slot != slot: changed.add(var.name)
+				var.slot = slot
+		program.code = None # bytecode for the global initializers bakes in their slots
+		for chunk in chunks:
+			if chunk.uses & changed: chunk.forget()
+		if parser.errors: raise diagnostics.CompileError(list(parser.errors))
+		self.analyze()
+		program.block.statements[:] = [stmt for chunk in chunks for stmt in chunk.block.statements]
+		return program
+
+	def analyze(self):
+		# Parser.finish, a chunk at a time, skipping chunks nothing they name has changed under
+		errors = self.parser.errors
+		for chunk in self.chunks:
+			if chunk.resolved is None: chunk.resolved = resolver.resolvePiece(chunk.block, chunk.definitions)
+		report(errors, [diag for chunk in self.chunks for diag in chunk.resolved])
+		if not errors:
+			for chunk in self.chunks:
+				if chunk.checked is None: chunk.checked = typechecker.checkPiece(chunk.block, chunk.definitions)
+			report(errors, [diag for chunk in self.chunks for diag in chunk.checked])
+		if errors: raise diagnostics.CompileError(list(errors))
+		if not self.parser.optimize: return
+		for chunk in self.chunks:
+			if not chunk.optimized: optimizer.optimizePiece(chunk.block, chunk.definitions)
+			chunk.optimized = True
+
+	def parse(self, chunk, until):
+		# reparses one chunk into the program, up to the first token of the next chunk
+		parser, scope = self.parser, self.program.scope
+		tokens = self.tokens(chunk.first, chunk.last)
+		if until is not None: tokens.append(self.token(*until))
+		before, errors = set(scope.definitions), len(parser.errors)
+		chunk.block = node_classes.Block()
+		chunk.refs = parser.names = []
+		parser.start(tokens)
+		parser.definitions(scope, chunk.block, tokens[-1] if until is not None else None)
+		parser.names = None
+		chunk.definitions = [defn for name, defn in scope.definitions.items() if name not in before]
+		chunk.uses = set([ref.name for ref in chunk.refs] + [defn.name for defn in chunk.definitions])
+		chunk.clean = len(parser.errors) == errors
+		chunk.optimized = False
+		chunk.forget()
+
+	def spans(self):
+		# (first, last) token of each chunk
+		spans, depth, first, last = [], 0, None, None
+		for number, (text, tokens, errors) in enumerate(self.lines):
+			for i, token in enumerate(tokens):
+				kind = token[0]
+				if kind == "LBRACE":
+					depth += 1
+				elif kind == "RBRACE":
+					depth = max(0, depth - 1)
+				elif depth == 0 and kind in scopes and first is not None:
+					spans.append((first, last))
+					first = None
+				if first is None: first = (number, i)
+				last = (number, i)
+		if first is not None: spans.append((first, last))
+		return spans
+
+	def token(self, number, i):
+		kind, value, line, column = self.lines[number][1][i]
+		return kind, value, number + 1, column
+
+	def tokens(self, first, last):
+		# the tokens from first to last, both included, numbered by their line in the whole source
+		ret = []
+		for number in xrange(first[0], last[0] + 1):
+			tokens = self.lines[number][1]
+			start = first[1] if number == first[0] else 0
+			stop = last[1] + 1 if number == last[0] else len(tokens)
+			ret.extend((kind, value, number + 1, column) for kind, value, line, column in tokens[start:stop])
+		return ret
+
+def moved(diags, shift):
+	if diags is None: return None
+	return [Diagnostic(diag.message, diag.line if diag.line is None else diag.line + shift, diag.column) for diag in diags]
+
+def lex(text):
+	errors = []
+	return text, list(lexer.tokenize(text, errors)), errors
+
+def report(errors, found):
+	for diag in sorted(found, key = lambda diag: diag.line):
+		log.error("ERROR %s", diag)
+		errors.append(diag)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+import re, os, mmap
+from .diagnostics import log, Diagnostic
+
+keywords    = ['return', 'cond', 'while',   'apply',    'call',  'tcall',   'func', 'proc', 'prebind',    'rpn',
+               'global',  'def', 'local',     'let',     'set',    'int',   'real', 'char',   'array', 'matrix',
+               'and',      'or',   'not',     'sin',     'cos',    'tan',   'asin', 'acos',    'atan',  'atan2', 'sqrt',
+               'true',  'false', 'empty', 'invalid', '_error_', '_init_', '_loop_', 'push', 'pop', 'peek', 'load', 'store']
+
+prefixops   = [('++', 'INCR'), ('--', 'DECR'), ('~',  'BNOT')]
+
+# symbol, token value, precedence (higher binds tighter; all are left-associative)
+infixops   = [('+',  'PLUS',  6), ('-',  'MINUS', 6), ('*',  'TIMES', 7), ('/',  'DIV', 7), ('%', 'MOD', 7), 
+               ('<',  'LT',    4), ('<=', 'LTE',   4), ('==', 'EQ',    3), ('>=', 'GTE', 4), ('>', 'GT',  4), 
+               ('<<', 'SHL',   5), ('>>', 'SHR',   5), ('&',  'BAND',  2), ('|',  'BOR', 0), ('^', 'BXOR', 1)]
+
+structurers = [('(', 'LPAREN'), (')', 'RPAREN'), ('{', 'LBRACE'), ('}', 'RBRACE'), ('[', 'LBRACKET'), (']', 'RBRACKET'), 
+               (';', 'SEMI'),   ('@', 'ATSIGN'), (',', 'COMMA'),    (':', 'COLON')]
+
+## Lookup Tables ##
+# built once at import; every token is a single hash lookup instead of a scan
+
+keywordTable  = dict((kw, (kw.upper(), None)) for kw in keywords)
+operatorTable = dict([(op[0], ('INFIXOP',  op[1])) for op in infixops]
+                   + [(op[0], ('PREFIXOP', op[1])) for op in prefixops] # prefix wins, as before
+                   + [("=", ("ASSIGN", None))])
+structTable   = dict((sym[0], (sym[1], None)) for sym in structurers)
+precedence    = dict((op[1], op[2]) for op in infixops)
+
+relex = r"[a-zA-Z_]\w*"
+def lexeme (scanner, token): 
+	return keywordTable.get(token) or ("ID", token)
+
+reop = r"[=+\-*/<>%&|^~]+"
+def operator (scanner, token):
+	return operatorTable[token] # tokenize has already reported any that isn't one
+
+renum = r"[0-9]+(\.[0-9]*)?|[0-9]*\.[0-9]+" # 5, 1., .4, 3.7 are all valid
+def number (scanner, token):
+	try:    return "INT",  int(token)
+	except: return "REAL", float(token)
+
+restrc = r"[(){}\[\];@,:]"
+def struct (scanner, token):
+	return structTable[token] # restrc matches nothing else
+ 
+recomm = r"//.*$"
+
+redstr = r'".*?"'
+resstr = r"'.*?'"
+def string (scanner, token):
+	return "STRING", token[1:-1]
+
+## Single-Pass Lexing ##
+# one master regex over the whole buffer; no per-line copies or token lists.
+# It is only compiled the first time something is lexed, so importing the
+# lexer (or anything that imports it) costs no regex work.
+
+masterRules = [
+    ("lexeme",   relex), # id or keyword
+    ("comment", recomm), # comment to end of line
+    ("operator",  reop), # prefix or infix
+    ("number",   renum), # int or real
+    ("struct",  restrc), # program structure
+    ("dstring", redstr), # string in double quotes
+    ("sstring", resstr), # string in single quotes
+    ("space",   r"\s+"), # whitespace, including newlines
+    ("invalid",    r"."), # anything else
+    ]
+master = None # masterRules as one compiled regex, once tokenize() has run
+
+def getMaster():
+	global master
+	if master is None: master = re.compile("|".join("(?P<%s>%s)" % rule for rule in masterRules), re.MULTILINE)
+	return master
+
+actions = {"lexeme": lexeme, "operator": operator, "number": number, "struct": struct,
+           "dstring": string, "sstring": string}
+
+def tokenize(buffer, errors = None):
+	# yields (type, value, line, column) lazily; buffer may be a string or an mmap.
+	# invalid input is skipped, and recorded in errors (a list) if one is given.
+	line, lineStart = 1, 0
+	for match in getMaster().finditer(buffer):
+		kind = match.lastgroup
+		if kind == "space":
+			text = match.group()
+			newlines = text.count("\n")
+			if newlines:
+				line += newlines
+				lineStart = match.start() + text.rindex("\n") + 1
+		elif kind == "comment":
+			pass
+		elif kind == "invalid":
+			report(errors, "Invalid token, ignored: \"" + match.group() + "\"", line, match.start() - lineStart + 1)
+		elif kind == "operator" and match.group() not in operatorTable:
+			report(errors, "Invalid operator, ignored: \"" + match.group() + "\"", line, match.start() - lineStart + 1)
+		else:
+			token = actions[kind](None, match.group())
+			yield token[0], token[1], line, match.start() - lineStart + 1
+
+def tokenizeFile(file, errors = None):
+	# scans a file object in place via mmap; falls back to reading pipes and empty files
+	try:
+		size = os.fstat(file.fileno()).st_size
+		if size == 0: raise ValueError
+		buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+	except (AttributeError, ValueError, EnvironmentError):
+		buffer = file.read()
+	return tokenize(buffer, errors)
+
+def echoed(text, tokens):
+	# passes tokens through, logging each line of text as the first token after it comes
+	lines = text.splitlines()
+	shown = 0
+	for token in tokens:
+		while shown < token[2]:
+			log.debug(" " * 50 + "Line %-6s%s", str(shown + 1) + ":", lines[shown].strip())
+			shown += 1
+		yield token
+	for shown in xrange(shown, len(lines)):
+		log.debug(" " * 50 + "Line %-6s%s", str(shown + 1) + ":", lines[shown].strip())
+
+def report(errors, txt, line, column):
+	log.warning("ERROR Line %d: %s", line, txt)
+	if errors is not None: errors.append(Diagnostic(txt, line, column))
@@ -0,0 +1,835 @@
+#!/usr/bin/env python
+import sys
+from . import runtime
+from .diagnostics import log, Diagnostic
+from .runtime import ExecutionError
+
+class Type:
+	INT, REAL, STRING, ARRAY = range(4)
+
+class Operator:
+	PLUS, MINUS, TIMES, DIVIDE = range(4)
+
+class ScopeError(Exception):
+	pass
+
+class Scope:
+	def __init__(self, parent, owner = None):
+		self.definitions = dict()
+		self.parent = parent # Scope
+		self.root   = self if parent is None else parent.root # where "def" and "global" definitions go
+		self.owner  = owner if owner is not None or parent is None else parent.owner # Procedure or Program holding our variables' slots
+	def add(self, name, definition):
+		log.debug("adding to scope: %s", name)
+		if self.definitions.has_key(name):
+			raise ScopeError("attempting to re-define name \"" + name + "\"")
+		self.definitions[name] = definition
+	def has_key(self, key):
+		return self.definitions.has_key(key)
+	def lookup(self, name):
+		# nearest enclosing definition of name, or None
+		scope = self
+		while scope is not None:
+			if scope.definitions.has_key(name): return scope.definitions[name]
+			scope = scope.parent
+		return None
+	def __getitem__(self, item):
+		return self.definitions[item]
+	def __str__(self):
+		ret = "Scope: "
+		ret += str(len(self.definitions)) + " items defined:\n"
+		for defn in self.definitions:
+			ret += str(defn) + " is a...\n" + str(self.definitions[defn])
+		return ret
+
+class Block:
+	def __init__(self):
+		self.statements = []
+		self.scope      = None # Scope, for definitions local to the block
+	def add(self, statement):
+		self.statements.append(statement)
+	def execute(self, frame):
+		# True once a "return" has run; frame.result holds its value
+		for stmt in self.statements:
+			if stmt.execute(frame): return True
+		return False
+	def __str__(self):
+		ret = "Block:\n"
+		for stmt in self.statements:
+			ret += str(stmt)
+			if not ret.endswith("\n"): ret += "\n"
+		return ret
+
+INIT_PROC   = runtime.INIT_PROC
+LOOP_PROC   = runtime.LOOP_PROC
+ROOT_SCOPES = ["def", "global"]
+
+class Program:
+	def __init__(self):
+		self.scope     = Scope(None, self) # Definition
+		self.block     = Block()           # top-level variable definitions, in source order
+		self.context   = None              # nothing encloses the program
+		self.frameSize = 0                 # global variable slots
+		self.code      = None              # bytecode.Code for the global initializers
+	def __getstate__(self): # bytecode doesn't pickle; the VM compiles it again
+		state = dict(self.__dict__)
+		state["code"] = None
+		return state
+	def add(self, name, definition):
+		log.debug("adding to program: %s", name)
+		self.scope.add(name, definition)
+	def allocate(self):
+		self.frameSize += 1
+		return self.frameSize - 1
+	def execute(self, machine = None):
+		# a fresh Machine per robot; the Program can be executed any number of times
+		machine = machine or runtime.Machine(self)
+		if not self.scope.has_key(INIT_PROC): log.debug("no " + INIT_PROC + "() procedure: nothing to do before " + LOOP_PROC + "()") # optional
+		machine.start()
+		return machine
+	def __str__(self):
+		ret = "Program:\n"
+		ret += str(self.scope)
+		return ret
+
+##### STMT TREE #########
+class Statement(object):
+	__slots__ = () # subclasses without their own __slots__ get a __dict__ as usual
+	def __init__(self):
+		pass # child-defined
+	def execute(self, frame):
+		pass # ditto.  returns True to stop the enclosing block (see Return)
+	def __str__(self):
+		ret = "Statement:\n"
+		return ret
+
+class Definition(Statement):
+	__slots__ = ('name',)
+	def __init__(self, name, context):
+		Statement.__init__(self)
+		self.name = name # Identifier
+		context.add(name, self)
+	def __str__(self):
+		ret = "Definition:\n"
+		return ret
+
+class Procedure(Definition):
+	class FormalParam(object):
+		__slots__ = ('type', 'name', 'owner', 'slot')
+		def __init__(self, type, name):
+			self.type  = type # Type
+			self.name  = name # Identifier
+			self.owner = None # Procedure
+			self.slot  = None # index into the owner's frame
+		def __str__(self):
+			ret = "FormalParam:\n"
+			ret += "type: " + str(self.type) + "; name: " + str(self.name) + "\n"
+			return ret
+	def __init__(self, name, context):
+		Definition.__init__(self, name, context)
+		self.formalparams = []              # FormalParam
+		self.block        = Block()         # Statement
+		self.context      = context         # Scope
+		self.scope        = Scope(context, self) # formal parameters; encloses the block
+		self.frameSize    = 0               # params first, then every local in the body
+		self.frames       = []              # released Frames, reused by later calls
+		self.blank        = []              # frameSize Nones, for clearing a released Frame
+		self.code         = None            # bytecode.Code, compiled on first call by the VM
+	def addParam(self, type, name):
+		param = self.FormalParam(type, name)
+		self.scope.add(name, param)
+		param.owner, param.slot = self, self.allocate()
+		self.formalparams.append(param)
+	def __getstate__(self):
+		# the frame pool and bytecode are rebuilt on demand: a Closure on a robot's
+		# stack takes us through the scheduler's pipes mid-run, pool and all
+		state = dict(self.__dict__)
+		state.update(frames = [], blank = [], code = None)
+		return state, {"name": self.name}
+	def addStmt(self, statement):
+		log.debug("stmt added: %s", statement)
+		self.block.add(statement)
+	def allocate(self):
+		self.frameSize += 1
+		return self.frameSize - 1
+	def acquire(self, caller, link = None):
+		# frames are pooled per procedure: a call only allocates when recursion goes deeper than before
+		if self.frames: frame = self.frames.pop()
+		else: frame = runtime.Frame(self, self.frameSize)
+		if link is None: link = self.staticLink(caller, "called")
+		frame.parent, frame.machine, frame.result = link, caller.machine, None
+		frame.machine.nesting += 1
+		return frame
+	def staticLink(self, frame, what):
+		# nearest active frame of our enclosing owner, from frame
+		link = frame
+		while link is not None and link.owner is not self.context.owner: link = link.parent
+		if link is None: raise ExecutionError(self.name + "() " + what + " outside the scope that defines it")
+		return link
+	def capture(self, frame):
+		# the static link for a Closure of ours made in frame: None if the globals will do.
+		# Otherwise it, and every frame it links to, is kept by the Closure, and so is not
+		# cleared or pooled when its call returns
+		if isinstance(self.context.owner, Program): return None
+		link = captured = self.staticLink(frame, "prebound")
+		while captured is not None and not captured.captured:
+			captured.captured = True
+			captured = captured.parent
+		return link
+	def release(self, frame):
+		frame.machine.nesting -= 1
+		if frame.captured: return # a Closure links to it: it leaves the pool
+		self.clear(frame)
+		frame.parent = frame.machine = None
+		self.frames.append(frame)
+	def clear(self, frame):
+		if len(self.blank) != self.frameSize: self.blank = [None] * self.frameSize
+		frame.slots[:] = self.blank
+		frame.result = frame.tail = None
+	def handoff(self, frame, link = None):
+		# the frame for a tcall out of frame: the same one again if we are tail-calling
+		# ourselves, else one from our pool, with the caller's going back to its own --
+		# unless we are defined inside frame's procedure.  frame is then our static link
+		# and has to outlive the caller, so it leaves the pool instead, and goes when
+		# nothing links to it any more.  link is a Closure's static link, if it has one
+		if frame.owner.block is self.block and not frame.captured and (link is None or link is frame.parent):
+			self.clear(frame)
+			return frame
+		callee = self.acquire(frame, link)
+		if callee.parent is frame:
+			frame.machine.nesting -= 1
+			frame.tail = None
+		else:
+			frame.owner.release(frame)
+		return callee
+	def bindParams(self, caller, frame, params, bound = None):
+		formals, slots = self.formalparams, frame.slots
+		values = [] # each param is evaluated once, even if the fast path gives up part-way
+		if bound is None and len(params) == len(formals):
+			for param, formal in zip(params, formals): # fast path: plain positional call
+				if param.name is not None: break
+				values.append(param.expr.evaluate(caller))
+				slots[formal.slot] = runtime.widen(formal.type, values[-1])
+			else: return
+		values.extend(param.expr.evaluate(caller) for param in params[len(values):])
+		self.bindValues(caller.machine, frame, [param.name for param in params], values, bound)
+	def bindValues(self, machine, frame, names, values, bound = None):
+		# bound values (see Closure) first; then named params by name; positional ones to
+		# the first unbound formal param in order; anything still unbound is popped off the
+		# data stack, left to right
+		formals, slots = self.formalparams, frame.slots
+		if bound is None:
+			unbound = list(formals)
+		else:
+			unbound = []
+			for formal, value in zip(formals, bound):
+				if value is UNBOUND: unbound.append(formal)
+				else: slots[formal.slot] = value
+		for name, value in zip(names, values):
+			if name is None:
+				if not unbound: raise ExecutionError("too many parameters for " + self.name + "()")
+				formal = unbound.pop(0)
+			else:
+				for formal in unbound:
+					if formal.name == name: break
+				else: raise ExecutionError(self.name + "() has no unbound parameter \"" + name + "\"")
+				unbound.remove(formal)
+			slots[formal.slot] = runtime.widen(formal.type, value)
+		for formal in unbound:
+			slots[formal.slot] = runtime.widen(formal.type, runtime.pop(machine, ()))
+	def prebind(self, frame, names, values):
+		# prebinding in frame: see closure
+		return self.closure(names, values, None, self.capture(frame))
+	def closure(self, names, values, bound, link):
+		# a Closure with each value bound, positional ones to the first unbound formal param
+		formals = self.formalparams
+		vector = [UNBOUND] * len(formals) if bound is None else list(bound)
+		for name, value in zip(names, values):
+			if name is None:
+				if UNBOUND not in vector: raise ExecutionError("too many parameters for " + self.name + "()")
+				i = vector.index(UNBOUND)
+			else:
+				for i, formal in enumerate(formals):
+					if formal.name == name: break
+				else: raise ExecutionError(self.name + "() has no parameter \"" + name + "\"")
+				if vector[i] is not UNBOUND: raise ExecutionError("parameter \"" + name + "\" bound twice")
+			vector[i] = runtime.widen(formals[i].type, value)
+		return Closure(self, tuple(vector), link)
+	def execute(self, caller, params = (), bound = None, link = None):
+		# bind params, execute statements.  stop on "return"
+		# statements can't return, but that's enforced in parsing.
+		# functions CAN return, and inherit from here.  easier than repeating logic
+		frame = self.acquire(caller, link)
+		try:
+			self.bindParams(caller, frame, params, bound)
+		except:
+			self.release(frame)
+			raise
+		return self.run(frame)
+	def call(self, caller, values, bound = None, link = None):
+		# as execute, with params that are already values (positional)
+		frame = self.acquire(caller, link)
+		try:
+			self.bindValues(caller.machine, frame, [None] * len(values), values, bound)
+		except:
+			self.release(frame)
+			raise
+		return self.run(frame)
+	def run(self, frame):
+		# execute the block, then whatever it tcalls, without nesting: a chain
+		# of tcalls uses one Python frame and at most two MIRV frames
+		sub = self
+		try:
+			while True:
+				sub.block.execute(frame)
+				if frame.tail is None: return frame.result
+				sub, names, values = frame.tail
+				bound = link = None
+				if sub.__class__ is Closure: sub, bound, link = sub.procedure, sub.bound, sub.link
+				frame = sub.handoff(frame, link)
+				sub.bindValues(frame.machine, frame, names, values, bound)
+		finally:
+			frame.owner.release(frame)
+	def __str__(self):
+		ret = "Procedure:\n"
+		for parm in self.formalparams:
+			ret += str(parm)
+		ret += str(self.block)
+		return ret
+
+class Function(Procedure):
+	def __init__(self, type, name, context):
+		Procedure.__init__(self, name, context)
+		self.returnType = type # Type
+	def __str__(self):
+		ret = "Function:\n"
+		ret += "returns: " + str(self.returnType) + "\n"
+		for parm in self.formalparams:
+			ret += str(parm)
+		ret += str(self.block)
+		return ret
+
+class Closure(object):
+	# what prebind gives back: the shared Procedure -- its body, compiled code
+	# and frame pool -- plus a vector of the values bound so far, one per
+	# formal param.  Nothing of the Procedure is copied; a call binds the
+	# vector into the new frame ahead of its own arguments.  A nested one
+	# also keeps the frame it was prebound in, as its calls' static link
+	__slots__ = ('procedure', 'bound', 'link')
+	def __init__(self, procedure, bound, link = None):
+		self.procedure = procedure # Procedure or Function
+		self.bound     = bound     # tuple: a Value, or UNBOUND, per formal param
+		self.link      = link      # Frame, or None for a top-level one (see Procedure.capture)
+	def __reduce__(self):
+		# the link stays behind: a snapshot (see scheduler) must not drag a machine's
+		# frames along, and is only looked at, never called
+		return Closure, (self.procedure, self.bound)
+	def prebind(self, frame, names, values):
+		return self.procedure.closure(names, values, self.bound, self.link)
+	def execute(self, caller, params = ()):
+		return self.procedure.execute(caller, params, self.bound, self.link)
+	def call(self, caller, values):
+		return self.procedure.call(caller, values, self.bound, self.link)
+	def __str__(self):
+		bound = [formal.name + " = " + repr(value) for formal, value in zip(self.procedure.formalparams, self.bound) if value is not UNBOUND]
+		return "prebound " + self.procedure.name + "(" + ", ".join(bound) + ")"
+
+class Unbound(object):
+	# marks a formal param a Closure leaves to the call; pickles as the one UNBOUND
+	__slots__ = ()
+	def __reduce__(self):
+		return "UNBOUND"
+
+UNBOUND     = Unbound()
+subroutines = (Procedure, Closure) # what a PROC or FUNC value can be
+
+def walkSubroutines(definitions):
+	# every Procedure among definitions, then every one defined inside those, and so on
+	seen = set()
+	pending = [definitions]
+	while pending:
+		for defn in pending.pop():
+			if isinstance(defn, Procedure) and id(defn) not in seen:
+				seen.add(id(defn))
+				yield defn
+				pending.append((defn.block.scope or defn.scope).definitions.values())
+
+def walkBlocks(block, definitions):
+	# (subroutine, block) for the top-level statements in block, with None, then for
+	# every subroutine among definitions, wherever it was defined.  The resolver,
+	# type checker and optimizer walk a whole program this way, or just the piece
+	# of one an edit touched (see incremental)
+	yield None, block
+	for defn in walkSubroutines(definitions):
+		yield defn, defn.block
+
+class Expression(Statement):
+	class OpElement(object):
+		__slots__ = ('operator', 'rest', 'typed', 'handler', 'eval_type', 'eval_value')
+		def __init__(self, operator, rest):
+			self.operator   = operator # InfixOperator
+			self.rest       = rest     # Expression
+			self.setTyped(False)
+			self.eval_type  = None
+			self.eval_value = None
+		def setTyped(self, typed):
+			self.typed   = typed # operands known to be INT or REAL
+			self.handler = runtime.handler(self.operator, typed)
+		def __getstate__(self): # handlers don't pickle; they are rebuilt from the operator
+			return self.operator, self.rest, self.typed, self.eval_type, self.eval_value
+		def __setstate__(self, state):
+			self.operator, self.rest, typed, self.eval_type, self.eval_value = state
+			self.setTyped(typed)
+	__slots__ = ('term', 'rest', 'eval_type', 'eval_value')
+	def __init__(self, term):
+		Statement.__init__(self)
+		self.term       = term # Term, or an Expression that binds tighter
+		self.rest       = []   # OpElement, all of one precedence
+		self.eval_type  = None
+		self.eval_value = None
+	def append(self, operator, rest):
+		self.rest.append(self.OpElement(operator, rest))
+	def evaluate(self, frame):
+		# evaluate term. for each op, evaluate next term and combine; operators check compatibility
+		value = self.term.evaluate(frame)
+		try:
+			for elem in self.rest:
+				value = elem.handler(value, elem.rest.evaluate(frame))
+		except (TypeError, ValueError, OverflowError) as e: # a typed handler given an untyped value, e.g. from pop(), or a negative shift
+			raise ExecutionError(str(e))
+		return value
+	def execute(self, frame):
+		self.evaluate(frame)
+	def __str__(self):
+		if not self.rest: return str(self.term)
+		ret = "(" + str(self.term)
+		for elem in self.rest:
+			ret += " " + str(elem.operator) + " " + str(elem.rest)
+		return ret + ")"
+
+class Cond(Statement):
+	class CondElement:
+		def __init__(self, cond, block):
+			self.cond  = cond  # Expression
+			self.block = block # Statement
+	def __init__(self):
+		Statement.__init__(self)
+		self.conds = [] # CondElement
+	def append(self, cond, block):
+		self.conds.append(self.CondElement(cond, block))
+	def execute(self, frame):
+		# for each element in turn, test cond.  for the first true one, execute corresponding block
+		for elem in self.conds:
+			if runtime.truth(elem.cond.evaluate(frame)):
+				return elem.block.execute(frame)
+	def __str__(self):
+		ret = "Cond:\n"
+		for elem in self.conds:
+			ret += "when " + str(elem.cond) + ": " + str(elem.block)
+		return ret
+
+class While(Statement):
+	def __init__(self, cond, block):
+		Statement.__init__(self)
+		self.cond  = cond  # Expression
+		self.block = block # Statement
+	def execute(self, frame):
+		# execute cond, then statements if evaluates to true.  repeat.
+		while runtime.truth(self.cond.evaluate(frame)):
+			if self.block.execute(frame): return True
+	def __str__(self):
+		ret = "While: " + str(self.cond) + ": " + str(self.block)
+		return ret
+
+class Set(Statement):
+	def __init__(self, lvalue, rvalue, index = None):
+		Statement.__init__(self)
+		self.lvalue = lvalue # Name of a Variable
+		self.rvalue = rvalue # Expression
+		self.index  = index  # Expression, Slice or Subscripts: set elements of an array instead
+	def execute(self, frame):
+		# figure out where lvalue is, and put rvalue there
+		value = self.rvalue.evaluate(frame)
+		if self.index is None: self.lvalue.store(frame, value)
+		else: self.lvalue.update(frame, self.index.evaluate(frame), value)
+	def __str__(self):
+		target = str(self.lvalue) if self.index is None else str(self.lvalue) + "[" + str(self.index) + "]"
+		ret = "Set: " + target + " = " + str(self.rvalue) + "\n"
+		return ret
+
+class RPN(Statement):
+	VAR, INFIX, PREFIX, FNKW, OPKW, LITERAL = range(6)
+	class RpnAtom(object):
+		__slots__ = ('type', 'content')
+		def __init__(self, type, content):
+			self.type    = type    # from list
+			self.content = content # reference/string/value
+	def __init__(self):
+		Statement.__init__(self)
+		self.atoms = [] # RpnAtom
+		self.code  = None # the atoms as one Python function of the frame, from compile()
+		self.need  = 0    # values that must be on the data stack going in
+		self.peak  = 0    # most values the statement has added to the data stack at any point
+	def append(self, type, content):
+		self.atoms.append(self.RpnAtom(type, content))
+	def execute(self, frame):
+		# do the push/pop/apply thing, on the machine's data stack.
+		# operators and function keywords pop their arguments and push their result
+		(self.code or self.compile())(frame)
+	def compile(self):
+		# straight-line Python for the atoms, built once when the program is loaded.
+		# Every atom's stack effect is known, so how deep the stack must be going in,
+		# and how much room it needs, are worked out here and checked once per run
+		# instead of once per atom.  Operands stay in Python locals rather than going
+		# through the data stack, which only sees the values left at the end -- and,
+		# before a builtin that works on the stack itself (pop, peek, store),
+		# everything pending.  The stack's slots and top are used directly
+		env  = {'ExecutionError': ExecutionError, 'infix': runtime.infix, 'prefix': runtime.prefix}
+		body = []
+		syms = [] # operands not yet on the data stack, bottom first: Python expressions
+		depth = need = peak = temps = 0
+		for i, atom in enumerate(self.atoms):
+			kind, content, name = atom.type, atom.content, "a%d" % i
+			if kind == RPN.LITERAL:
+				env[name] = content
+				syms.append(name)
+			elif kind == RPN.VAR:
+				env[name] = content
+				syms.append(name + ".load(frame)")
+			if kind in (RPN.LITERAL, RPN.VAR):
+				depth += 1 # in a local: no room taken on the data stack yet
+				continue
+			if kind == RPN.INFIX:    arity = 2
+			elif kind == RPN.PREFIX: arity = 1
+			elif kind == RPN.OPKW:   arity, env[name] = runtime.opkws[content]
+			else:                    arity, env[name] = runtime.arities[content], runtime.functions[content]
+			depth -= arity
+			need = max(need, -depth)
+			args = syms[max(0, len(syms) - arity):]
+			del syms[len(syms) - len(args):]
+			popped = ["t%d" % (temps + n) for n in range(arity - len(args))] # the rest come off the data stack
+			temps += len(popped)
+			for temp in reversed(popped):
+				body.append("top -= 1; %s = slots[top]; slots[top] = None" % temp)
+			args = popped + args
+			if kind == RPN.FNKW and content not in runtime.pure: # works on the data stack itself
+				reads, change = runtime.stackEffects.get(content, (0, 0))
+				need = max(need, reads - depth)
+				if syms: body.append("slots[top:top + %d] = %s,; top += %d" % (len(syms), ", ".join(syms), len(syms)))
+				syms = []
+				peak = max(peak, depth) # everything pending is on the data stack now
+				depth += change
+				body.append("stack.top = top; value = %s(machine, [%s]); top = stack.top" % (name, ", ".join(args)))
+				body.append("slots[top] = value; top += 1")
+			else:
+				if kind == RPN.INFIX:    call = "infix(%r, %s, %s)" % (content, args[0], args[1])
+				elif kind == RPN.PREFIX: call = "prefix(%r, %s)" % (content, args[0])
+				elif kind == RPN.OPKW:   call = "%s(%s)" % (name, ", ".join(args))
+				else:                    call = "%s(machine, [%s])" % (name, ", ".join(args))
+				if popped: body.append("stack.top = top") # so the stack stays whole if the call raises
+				body.append("t%d = %s" % (temps, call))
+				syms.append("t%d" % temps)
+				temps += 1
+			depth += 1
+			peak = max(peak, depth - len(syms)) # what is really on the data stack
+		if syms: body.append("slots[top:top + %d] = %s,; top += %d" % (len(syms), ", ".join(syms), len(syms)))
+		if body: body.append("stack.top = top")
+		peak = max(peak, depth)
+		head = ["def rpn(frame):", "machine = frame.machine", "stack = machine.stack", "slots, top = stack.slots, stack.top"]
+		if need: head.append("if top < %d: raise ExecutionError(\"stack underflow in rpn: needs %d, found \" + str(top))" % (need, need))
+		if peak: head.append("if top + %d > len(slots): raise ExecutionError(\"stack overflow in rpn: capacity is \" + str(len(slots)))" % peak)
+		exec "\n\t".join(head + body) in env
+		self.code, self.need, self.peak = env["rpn"], need, peak
+		return self.code
+	def __getstate__(self): # the compiled function doesn't pickle; it is rebuilt on load
+		state = dict(self.__dict__)
+		state["code"] = None
+		return state
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.compile()
+	def __str__(self):
+		ret = "RPN:"
+		for atom in self.atoms:
+			ret += " " + str(atom.content)
+		return ret + "\n"
+
+def addActualParam(site, name, expr):
+	# addParam for Call, Apply and Prebinding.  name is None for positional
+	# params; they bind to the first unbound formal param
+	site.params.append(ActualParam(name, expr))
+
+class Call(Statement):
+	def __init__(self, name, scope, tail = False, line = None):
+		Statement.__init__(self)
+		self.name   = name  # Identifier or KW
+		self.scope  = scope # Scope the call appears in
+		self.tail   = tail  # tcall
+		self.line   = line  # source line, for diagnostics
+		self.params = []    # ActualParam
+		self.callee = None  # builtin or Name, found on first execution
+	addParam = addActualParam
+	def execute(self, frame):
+		if not self.tail or not isinstance(frame.owner, Procedure):
+			invoke(frame, self, runtime.procedures)
+			return
+		# tcall: evaluate the params here, then stop the block like a return;
+		# the enclosing Procedure.run makes the call in place of this one
+		callee = target(frame, self, runtime.procedures)
+		if not isinstance(callee, subroutines):
+			invoke(frame, self, runtime.procedures)
+			return True
+		values = [param.expr.evaluate(frame) for param in self.params]
+		frame.tail = (callee, [param.name for param in self.params], values)
+		return True
+	def __str__(self):
+		ret = ("TCall: " if self.tail else "Call: ") + str(self.name)
+		ret += "(" + ", ".join(str(parm) for parm in self.params) + ")\n"
+		return ret
+
+class Return(Statement):
+	def __init__(self, expr):
+		Statement.__init__(self)
+		self.expr        = expr # Expression
+		self.eval_type   = None # Type
+		self.eval_value  = None # Value
+	def execute(self, frame):
+		frame.result = self.expr.evaluate(frame)
+		return True
+	def __str__(self):
+		ret = "Return: " + str(self.expr) + "\n"
+		return ret
+#########################
+
+##### TERM TREE #########
+class Term(object):
+	LITERAL, PREBINDING, INDEXABLE , PREFIXOP= range(4)
+	__slots__ = ('kind', 'value', 'eval_type', 'eval_value')
+	def __init__(self, kind = LITERAL, value = None):
+		self.kind        = kind # from list
+		self.value       = value   # Value, for literal or expression
+		self.eval_type   = None    # Type
+		self.eval_value  = None    # Value
+	def evaluate(self, frame):
+		return self.value # literal
+	def __str__(self):
+		return repr(self.value)
+
+class Name(object):
+	# a reference to a definition, bound to a frame depth and slot by the
+	# resolver (or on first use, for trees built by hand), so nothing at
+	# runtime ever looks the name up again
+	__slots__ = ('name', 'scope', 'line', 'definition', 'slot', 'depth')
+	def __init__(self, name, scope, line = None):
+		self.name       = name  # Identifier
+		self.scope      = scope # Scope the name appears in
+		self.line       = line  # source line, for diagnostics
+		self.definition = None  # Variable, FormalParam or Procedure, once bound
+		self.slot       = None  # slot in the definition's frame
+		self.depth      = None  # static links to follow to reach that frame; -1 for a procedure
+	def resolve(self):
+		return self.scope.lookup(self.name)
+	def bind(self):
+		defn = self.resolve()
+		if defn is None: raise ExecutionError("undefined name \"" + self.name + "\"")
+		self.definition = defn
+		if isinstance(defn, Procedure):
+			self.depth = -1
+			return
+		owner, depth = self.scope.owner, 0
+		while owner is not defn.owner:
+			owner, depth = owner.context.owner, depth + 1
+		self.slot  = defn.slot
+		self.depth = depth # last: marks the Name as bound
+	def load(self, frame):
+		depth = self.depth
+		if depth is None:
+			self.bind()
+			depth = self.depth
+		if depth < 0: return self.definition
+		while depth:
+			frame, depth = frame.parent, depth - 1
+		return frame.slots[self.slot]
+	evaluate = load
+	def store(self, frame, value):
+		depth = self.depth
+		if depth is None:
+			self.bind()
+			depth = self.depth
+		if depth < 0: raise ExecutionError("cannot set \"" + self.name + "\": it is a subroutine")
+		while depth:
+			frame, depth = frame.parent, depth - 1
+		frame.slots[self.slot] = runtime.widen(self.definition.type, value)
+	def update(self, frame, key, value):
+		# set name[key] = value, in place unless the array is shared (see runtime.setIndex)
+		depth = self.depth
+		if depth is None:
+			self.bind()
+			depth = self.depth
+		if depth < 0: raise ExecutionError("cannot set \"" + self.name + "\": it is a subroutine")
+		while depth:
+			frame, depth = frame.parent, depth - 1
+		runtime.setIndex(frame.slots, self.slot, key, value)
+	def __str__(self):
+		return self.name
+
+class Indexable(Term):
+	__slots__ = ('index',)
+	def __init__(self, expr, index = None):
+		Term.__init__(self, Term.INDEXABLE, expr) # Name, Function Application, or Expression
+		self.index = index # Expression, Slice or Subscripts
+	def evaluate(self, frame):
+		# if result is indexable and index is present, the result is the element indexed
+		value = self.value.evaluate(frame)
+		if self.index is None: return value
+		return runtime.index(value, self.index.evaluate(frame))
+	def __str__(self):
+		ret = str(self.value)
+		if self.index is not None: ret += "[" + str(self.index) + "]"
+		return ret
+
+class Slice(object):
+	# start:stop in an index; either end may be left off.  Slicing an ARRAY or
+	# MATRIX gives a view that shares its buffer, so a row passed to a
+	# subroutine isn't copied -- until someone sets an element of it
+	__slots__ = ('start', 'stop')
+	def __init__(self, start, stop):
+		self.start = start # Expression or None
+		self.stop  = stop  # Expression or None
+	def evaluate(self, frame):
+		start = None if self.start is None else self.start.evaluate(frame)
+		stop  = None if self.stop  is None else self.stop.evaluate(frame)
+		return slice(start, stop)
+	def __str__(self):
+		return ("" if self.start is None else str(self.start)) + ":" + ("" if self.stop is None else str(self.stop))
+
+class Subscripts(object):
+	# more than one subscript, for a MATRIX: m[i, j], m[0:2, 1]
+	__slots__ = ('parts',)
+	def __init__(self, parts):
+		self.parts = parts # Expression or Slice
+	def evaluate(self, frame):
+		return tuple(part.evaluate(frame) for part in self.parts)
+	def __str__(self):
+		return ", ".join(str(part) for part in self.parts)
+
+class Apply(Indexable):
+	__slots__ = ('name', 'scope', 'params', 'callee', 'line')
+	def __init__(self, name, scope, line = None):
+		Indexable.__init__(self, None)
+		self.name   = name  # Identifier or KW
+		self.scope  = scope # Scope the application appears in
+		self.line   = line  # source line, for diagnostics
+		self.params = []    # ActualParam
+		self.callee = None  # builtin or Name, found on first execution
+	addParam = addActualParam
+	def evaluate(self, frame):
+		# if result is indexable and index is present, the result is the element indexed
+		value = invoke(frame, self, runtime.functions)
+		if self.index is None: return value
+		return runtime.index(value, self.index.evaluate(frame))
+	def __str__(self):
+		ret = "apply " + str(self.name) + "(" + ", ".join(str(parm) for parm in self.params) + ")"
+		if self.index is not None: ret += "[" + str(self.index) + "]"
+		return ret
+
+class Prefix(Indexable):
+	__slots__ = ('operator', 'expr')
+	def __init__(self, operator, expr):
+		Indexable.__init__(self, expr)
+		self.kind     = Term.PREFIXOP
+		self.operator = operator # PrefixOperator
+		self.expr     = expr     # Expression
+	def evaluate(self, frame):
+		# evaluate expression.  apply operator
+		value = runtime.prefix(self.operator, self.expr.evaluate(frame))
+		if self.index is None: return value
+		return runtime.index(value, self.index.evaluate(frame))
+	def __str__(self):
+		ret = str(self.operator) + " " + str(self.expr)
+		if self.index is not None: ret += "[" + str(self.index) + "]"
+		return ret
+
+class Prebinding(Term):
+	__slots__ = ('name', 'scope', 'params', 'eval_sub', 'target')
+	def __init__(self, name, scope):
+		Term.__init__(self, Term.PREBINDING)
+		self.name      = name  # Identifier
+		self.scope     = scope # Scope the prebinding appears in
+		self.params    = []    # ActualParam
+		self.eval_sub  = None  # Function or Procedure
+		self.target    = Name(name, scope)
+	addParam = addActualParam
+	def evaluate(self, frame):
+		# the subroutine, with our params bound
+		sub = self.target.load(frame)
+		if not isinstance(sub, subroutines): raise ExecutionError("cannot prebind \"" + self.name + "\": not a subroutine")
+		values = [param.expr.evaluate(frame) for param in self.params]
+		return sub.prebind(frame, [param.name for param in self.params], values)
+	def __str__(self):
+		ret = "prebind " + str(self.name) + "(" + ", ".join(str(parm) for parm in self.params) + ")"
+		return ret
+#########################
+
+class ActualParam(object):
+	__slots__ = ('name', 'expr')
+	def __init__(self, name, expr):
+		self.name = name # Idenfifier, optional
+		self.expr = expr # Expression
+	def __str__(self):
+		ret = str(self.expr)
+		if self.name is not None: ret = "@" + self.name + " = " + ret
+		return ret
+
+class Variable(Definition):
+	__slots__ = ('type', 'init', 'value', 'properties', 'owner', 'slot', 'line')
+	def __init__(self, name, type, line, context):
+		Definition.__init__(self, name, context)
+		self.type  = type        # Type
+		self.init  = None        # Expression
+		self.line  = line        # source line, for diagnostics
+		self.value = None        # Value
+		self.properties = None   # String-Variable pairs; a dict once there are any
+		self.owner = context.owner         # Procedure or Program
+		self.slot  = self.owner.allocate() # index into the owner's frame
+	def execute(self, frame):
+		value = self.init.evaluate(frame)
+		while frame.owner is not self.owner: # a "def" inside a subroutine still lives in the globals
+			frame = frame.parent
+		frame.slots[self.slot] = runtime.widen(self.type, value)
+	def __str__(self):
+		ret = "Variable:\n"
+		ret += "type: " + str(self.type) + "; init: " + str(self.init) + "\n"
+		return ret
+
+def target(frame, site, builtins):
+	# what a Call or Apply names: a builtin keyword, or a subroutine reached through a Name
+	callee = site.callee
+	if callee is None:
+		callee = site.callee = builtins.get(site.name) or Name(site.name, site.scope)
+	if isinstance(callee, Name):
+		sub = callee.load(frame)
+		if not isinstance(sub, subroutines): raise ExecutionError("\"" + site.name + "\" is not a subroutine")
+		return sub
+	return callee
+
+def tooDeep(name, callee):
+	# the error for a call that would nest past MAX_NESTING, at the call's line
+	line = callee.line if isinstance(callee, Name) else None
+	return ExecutionError(str(Diagnostic("calls nested more than %d deep, calling %s()" % (runtime.MAX_NESTING, name), line)))
+
+def invoke(frame, site, builtins):
+	callee = target(frame, site, builtins)
+	if isinstance(callee, subroutines):
+		if frame.machine.nesting >= runtime.MAX_NESTING: raise tooDeep(site.name, site.callee)
+		return callee.execute(frame, site.params)
+	for param in site.params:
+		if param.name is not None: raise ExecutionError(site.name + "() takes no named parameters")
+	return callee(frame.machine, [param.expr.evaluate(frame) for param in site.params])
+
+# module-level names for the nested helper classes, so pickle can find them
+# (parsed programs travel back from process pools and into caches)
+FormalParam = Procedure.FormalParam
+OpElement   = Expression.OpElement
+CondElement = Cond.CondElement
+RpnAtom     = RPN.RpnAtom
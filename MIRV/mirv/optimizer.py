@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+from . import runtime
+from .runtime import ExecutionError
+from .node_classes import Term, Expression, Indexable, Apply, Prefix, Prebinding, Slice, Subscripts
+from .node_classes import Block, Variable, Cond, While, Set, Call, Return, walkBlocks
+from .diagnostics import log
+
+## Optimizer ##
+# One pass over a parsed Program, run before anything executes it: literal
+# arithmetic is folded (sin/cos/sqrt... included), cond arms that can never
+# run are dropped, and so are while loops whose guard is constantly false.
+# Anything that would fail at runtime (1 / 0, sqrt(-1)) is left alone, so
+# the robot still gets its ExecutionError when it actually gets there.
+
+literalTypes = {int: "INT", long: "INT", float: "REAL", str: "STRING"}
+
+def optimize(program):
+	optimizePiece(program.block, program.scope.definitions.values())
+	return program
+
+def optimizePiece(block, definitions):
+	for sub, body in walkBlocks(block, definitions):
+		foldBlock(body)
+
+## Statements ##
+
+def foldBlock(block):
+	statements = []
+	for stmt in block.statements:
+		stmt = foldStatement(stmt)
+		if stmt is not None: statements.append(stmt)
+	block.statements[:] = statements
+	return block
+
+def foldStatement(stmt):
+	# the statement to keep in its place, or None to drop it
+	if isinstance(stmt, Variable):
+		stmt.init = fold(stmt.init)
+	elif isinstance(stmt, Set):
+		stmt.rvalue = fold(stmt.rvalue)
+		if stmt.index is not None: stmt.index = foldIndex(stmt.index)
+	elif isinstance(stmt, Return):
+		stmt.expr = fold(stmt.expr)
+	elif isinstance(stmt, Call):
+		foldParams(stmt)
+	elif isinstance(stmt, Expression):
+		stmt = fold(stmt)
+		if constant(stmt): return None # nothing to see
+	elif isinstance(stmt, Cond):
+		return foldCond(stmt)
+	elif isinstance(stmt, While):
+		stmt.cond = fold(stmt.cond)
+		if constant(stmt.cond) and not runtime.truth(value(stmt.cond)):
+			log.debug("dropped while loop that never runs: %s", stmt.cond)
+			return None
+		foldBlock(stmt.block)
+	elif isinstance(stmt, Block):
+		foldBlock(stmt)
+	return stmt
+
+def foldCond(stmt):
+	# arms after an always-true one are unreachable, and always-false ones never run
+	conds = []
+	for elem in stmt.conds:
+		elem.cond = fold(elem.cond)
+		if constant(elem.cond):
+			if not runtime.truth(value(elem.cond)): continue
+			conds.append(elem)
+			break
+		conds.append(elem)
+	for elem in conds:
+		foldBlock(elem.block)
+	if len(conds) < len(stmt.conds): log.debug("pruned %d cond arm(s)", len(stmt.conds) - len(conds))
+	stmt.conds = conds
+	if not conds: return None
+	if constant(conds[0].cond): return conds[0].block # always taken: just the block
+	return stmt
+
+## Expressions ##
+
+def isLiteral(term):
+	return term.__class__ is Term and term.kind == Term.LITERAL
+
+def constant(expr):
+	return isinstance(expr, Expression) and not expr.rest and isLiteral(expr.term)
+
+def value(expr):
+	return expr.term.value
+
+def literal(val):
+	term = Term(Term.LITERAL, val)
+	term.eval_type, term.eval_value = literalTypes.get(type(val)), val
+	return term
+
+def fold(expr):
+	# expr with its constant parts evaluated; a constant expr comes back as a lone literal
+	expr.term = foldTerm(expr.term)
+	for elem in expr.rest:
+		elem.rest = fold(elem.rest)
+	if not isLiteral(expr.term): return expr
+	# fold the leading run of constants; operators are left-associative, so no further
+	val, done = expr.term.value, 0
+	for elem in expr.rest:
+		if not constant(elem.rest): break
+		try:
+			val = runtime.infix(elem.operator, val, value(elem.rest))
+		except ExecutionError:
+			break
+		done += 1
+	if done: expr.term, expr.rest = literal(val), expr.rest[done:]
+	return expr
+
+def foldTerm(term):
+	# a Term, or an Expression in term position; both may come back as literals
+	if isinstance(term, Expression):
+		term = fold(term)
+		return term.term if constant(term) else term
+	if isinstance(term, Prebinding):
+		foldParams(term)
+		return term
+	if not isinstance(term, Indexable): return term # literal
+	if term.index is not None: term.index = foldIndex(term.index)
+	if isinstance(term, Apply):
+		foldParams(term)
+		if term.index is None and term.name in runtime.pure \
+		   and all(param.name is None and constant(param.expr) for param in term.params):
+			try:
+				return literal(runtime.functions[term.name](None, [value(param.expr) for param in term.params]))
+			except (ExecutionError, TypeError):
+				pass
+		return term
+	if isinstance(term, Prefix):
+		term.expr = term.value = fold(term.expr)
+		if term.index is None and constant(term.expr):
+			try:
+				return literal(runtime.prefix(term.operator, value(term.expr)))
+			except ExecutionError:
+				pass
+		return term
+	if isinstance(term.value, Expression): # parens
+		term.value = fold(term.value)
+		if term.index is None and constant(term.value): return term.value.term
+	return term
+
+def foldIndex(index):
+	if isinstance(index, Subscripts):
+		index.parts = [foldIndex(part) for part in index.parts]
+	elif isinstance(index, Slice):
+		if index.start is not None: index.start = fold(index.start)
+		if index.stop is not None:  index.stop = fold(index.stop)
+	else:
+		index = fold(index)
+	return index
+
+def foldParams(site):
+	for param in site.params:
+		param.expr = fold(param.expr)
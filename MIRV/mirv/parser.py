@@ -0,0 +1,527 @@
+#!/usr/bin/env python
+from . import lexer, node_classes, diagnostics, runtime, optimizer, resolver, typechecker
+from .diagnostics import log
+
+EOF = "end-of-file"
+
+
+## Terminal Sets ##
+
+varTypes = ["INT", "REAL", "ARRAY", "LIST", "STRING", "MATRIX"]
+allTypes = varTypes + ["PROC", "FUNC"]
+locals   = ["LET", "LOCAL"]
+globals  = ["DEF", "GLOBAL"]
+scopes   = locals + globals
+literals = ["INT", "REAL", "STRING"]#, "CHAR", "ARRAY", "MATRIX", "BOOL"]
+funcKeys = ['SIN', 'COS', 'TAN', 'ASIN', 'ACOS', 'ATAN', 'ATAN2', 'SQRT', 'PEEK', 'POP', 'STORE'] # as the lexer spells them
+ctorKeys = ['ARRAY', 'MATRIX'] # type names that double as builtin functions, after "apply"
+procKeys = ['_ERROR_', '_INIT_', '_LOOP_', 'PUSH', 'LOAD']
+opKeys   = ['AND', 'OR', 'NOT']
+valKeys  = ['TRUE', 'FALSE', 'EMPTY', 'INVALID',]
+kwStmts  = ["SET", "RPN", "RETURN", "COND", "CALL", "TCALL"]
+
+## Recovery Sets ##
+# Panic mode discards tokens until one of these.  They are the FOLLOW sets
+# noted on the recursors, minus the expression starters (identifiers,
+# literals, parens...) which turn up mid-statement far too often to trust.
+
+syncStatement = kwStmts + ["WHILE"] + scopes + ["SEMI", "RBRACE", EOF] # FOLLOW(statement) = FIRST(statement) + '}'
+syncProgram   = scopes + [EOF]                                         # FIRST(definition) + FOLLOW(program)
+
+## Parser ##
+# All token state lives on the instance, so independent Parsers can run
+# side by side in threads; nothing is read or parsed at import time.
+# Syntax errors are collected rather than fatal: a bad program raises one
+# CompileError listing everything found, and the Parser stays usable.
+
+class Panic(Exception):
+	pass # unwinds to the nearest recovery point after a syntax error
+
+class Parser:
+	def __init__(self, optimize = True):
+		self.optimize = optimize # fold constants and prune dead branches (see optimizer)
+		self.sym      = None # current token: (type, value[, line, column])
+		self.lex      = None # token generator
+		self.position = 0    # tokens consumed, to detect recovery without progress
+		self.errors   = []   # Diagnostic, shared with the lexer
+		self.names    = None # every Name and Variable built, when a caller wants their lines (see incremental)
+
+	def parse_string(self, text):
+		return self.parse(lexer.tokenize(text, self.errors))
+
+	def parse_file(self, path):
+		with open(path) as file:
+			return self.parse_stream(file)
+
+	def parse_stream(self, stream):
+		if diagnostics.debugging(): # line-by-line echo for -vvv, lexed the same as ever
+			text = stream.read()
+			return self.parse(lexer.echoed(text, lexer.tokenize(text, self.errors)))
+		return self.parse(lexer.tokenizeFile(stream, self.errors))
+
+	def parse(self, tokens):
+		del self.errors[:] # emptied in place: a lazy tokenizer may already hold it
+		self.start(tokens)
+		ast = self.program() # start parsing at the start symbol
+		return self.finish(ast)
+
+	def finish(self, ast):
+		# name resolution and type checking over a whole Program, then the optimizer
+		for check in (resolver.resolve, typechecker.check): # each needs the one before to have passed
+			if self.errors: break
+			for diag in sorted(check(ast), key = lambda diag: diag.line):
+				log.error("ERROR %s", diag)
+				self.errors.append(diag)
+		if self.errors: raise diagnostics.CompileError(list(self.errors))
+		if self.optimize: optimizer.optimize(ast)
+		return ast
+
+	## Streamy Stuff ##
+
+	def start(self, tokens):
+		self.lex = iter(tokens)
+		self.position = 0
+		self.nextsym() # initialize sym
+
+	def nextsym(self):
+		try:
+			self.sym = self.lex.next()
+		except StopIteration as i:
+			self.sym = (EOF, None)
+		self.position += 1
+		#print self.sym
+
+	def error(self, expected):
+		self.report("expected " + expected + ", got " + self.sym[0])
+		raise Panic()
+
+	def line(self):
+		return self.sym[2] if len(self.sym) > 3 else None
+
+	def report(self, message):
+		line, column = self.sym[2:4] if len(self.sym) > 3 else (None, None)
+		diag = diagnostics.Diagnostic(message, line, column)
+		log.error("ERROR %s", diag)
+		self.errors.append(diag)
+
+	def synchronize(self, stopAt, start):
+		# panic mode: skip to something that can follow the broken construct
+		while self.sym[0] not in stopAt:
+			self.nextsym()
+		if self.sym[0] == "SEMI" or (self.position == start and self.sym[0] != EOF):
+			self.nextsym() # finish the broken statement, or at least make progress
+
+	def define(self, cls, *args):
+		# a redefinition is reported, then parsed against a scratch scope so we carry on
+		try:
+			return cls(*args)
+		except node_classes.ScopeError as e:
+			self.report(str(e))
+			return cls(*(args[:-1] + (node_classes.Scope(args[-1]),)))
+
+	def remember(self, name):
+		if self.names is not None: self.names.append(name)
+		return name
+
+	def consume(self, target, english): # "None" for english when missing symbol is ok
+		if (isinstance(target, list) and self.sym[0] in target) \
+		    or self.sym[0] == target: # relying on short-circuited "or"
+			ret = self.sym
+			self.nextsym()
+			return ret
+		elif english: self.error(english)
+		else: return None
+
+	### Recursors ###
+	# each recursor returns the node it built
+
+	# FIRST: "scope"
+	# FOLLOW: "end-of-file"
+	def program(self):
+		ast = node_classes.Program()
+		#print "root scope is " + str(ast.scope)
+		self.definitions(ast.scope, ast.block)
+		return ast
+
+	# FIRST: "scope"
+	# FOLLOW: "end-of-file", or the token "until"
+	def definitions(self, currScope, stmtlist, until = None):
+		# -> { definition } .   stopping at until as well, to parse one piece of a program
+		while self.sym[0] != EOF and self.sym is not until:
+			start = self.position
+			try:
+				self.definition(currScope, stmtlist)
+			except Panic:
+				self.synchronize(syncProgram, start)
+
+	# FIRST: "scope"
+	# FOLLOW: = FOLLOW(statement) + 'end-of-file'
+	def definition(self, currScope, stmtlist):
+		# -> scope ( funcDef | procDef | varDef ) .
+		scopeKW = self.consume(scopes, "scope")[0]
+		useScope = currScope if scopeKW in locals else currScope.root
+		#print useScope
+		if self.sym[0] == "FUNC":
+			return self.funcdef(useScope)
+		elif self.sym[0] == "PROC":
+			return self.procdef(useScope)
+		elif self.sym[0] in varTypes:
+			return self.vardef(useScope, currScope, stmtlist)
+		else: self.error("type specifier")
+
+	# FIRST: "func"
+	# FOLLOW: = FOLLOW(statement) + 'end-of-file'
+	def funcdef(self, funcScope):
+		# -> "func" typename identifier formalparams "(" "=" ")" block .
+		self.consume("FUNC", "func")
+		funcReturnType = self.consume(varTypes, "variable type specifier")[0] # FUNC/PROC handled separately
+		funcName = self.consume("ID", "identifier")[1]
+		func = self.define(node_classes.Function, funcReturnType, funcName, funcScope)
+		#print "function setup: ", funcScope, funcReturnType, funcName
+		self.consume("LPAREN", "open paren")
+		self.formalparams(func)
+		self.consume("RPAREN", "close paren")
+		self.consume("ASSIGN", "assignment")
+		self.block(func.scope, func.block)
+		return func
+
+	# FIRST: "proc"
+	# FOLLOW: = FOLLOW(statement) + 'end-of-file'
+	def procdef(self, procScope):
+		# -> "proc" ( identifier | prockw ) "(" formalparams ")" =" block .
+		self.consume("PROC", "proc")
+		if self.sym[0] in procKeys: # _init_, _loop_ and friends are defined like any other proc
+			procName = self.consume(procKeys, None)[0].lower()
+		else:
+			procName = self.consume("ID", "identifier")[1]
+		#print procScope
+		proc = self.define(node_classes.Procedure, procName, procScope)
+		self.consume("LPAREN", "open paren")
+		self.formalparams(proc)
+		self.consume("RPAREN", "close paren")
+		self.consume("ASSIGN", "assignment")
+		self.block(proc.scope, proc.block)
+		return proc
+
+	# FIRST: "typename"
+	# FOLLOW: = FOLLOW(statement) + 'end-of-file'
+	def vardef(self, varScope, currScope, stmtlist):
+		# -> typename identifier "=" expression ";" . 
+		varType = self.consume(varTypes, "variable type specifier")[0]
+		line = self.line()
+		varName = self.consume("ID", "identifier")[1]
+		var = self.remember(self.define(node_classes.Variable, varName, varType, line, varScope))
+		self.consume("ASSIGN", "assignment")
+		var.init = self.expression(currScope) # initializer sees the enclosing scope, even for globals
+		self.consume("SEMI", "semicolon")
+		stmtlist.add(var) # initialized when control reaches it
+		return var
+
+	# FIRST: "{"
+	# FOLLOW: = FOLLOW(statement) + 'end-of-file'
+	def block(self, encloser, stmtlist):
+		# -> "{" { statement } "}" . 
+		self.consume("LBRACE", "open brace")
+		inner = node_classes.Scope(encloser)
+		stmtlist.scope = inner
+		while self.sym[0] in ["PREBIND", "PREFIXOP", "SET", "LPAREN", "ID", "COND", "CALL", "TCALL", \
+		                      "RPN", "RETURN", "APPLY", "WHILE"] + literals + scopes:
+			self.statement(inner, stmtlist)
+		self.consume("RBRACE", "close brace")
+		return stmtlist
+
+	# FIRST: '(', 'apply', 'call', 'cond', 'identifier', 'literal', 'prebind', 
+	#        'prefixop', 'return', 'rpn', 'scope', 'set', 'tcall', 'while''
+	# FOLLOW: = FIRST(statement) + '}'
+	def statement(self, currScope, stmtlist):
+		start = self.position
+		try:
+			# -> definition                            FIRST: "scope"
+			if self.sym[0] in scopes:
+				return self.definition(currScope, stmtlist) # variables add themselves to stmtlist
+				# ends with block, not semicolon
+			# -> "while" while_s .                     FIRST: "while"
+			elif self.sym[0] == "WHILE":
+				stmt = self.while_s(currScope)
+				# ends with block, not semicolon
+			# -> "cond" cond .                         FIRST: "cond"
+			elif self.sym[0] == "COND":
+				stmt = self.cond(currScope)
+				# ends with block, not semicolon
+			# -> expression ";" .                      FIRST: "prebind", "prefixop", "literal", "apply", "identifier", "("
+			elif self.sym[0] in ["PREBIND", "PREFIXOP", "APPLY", "ID", "LPAREN"] + literals:
+				stmt = self.expression(currScope)
+				self.consume("SEMI", "semicolon")
+			# -> ( "call" | "tcall" ) cbinding ";" .   FIRST: "call", "tcall"
+			elif self.sym[0] in ["CALL", "TCALL"]:
+				stmt = self.call(currScope)
+				self.consume("SEMI", "semicolon")
+			# -> "set" identifier [ index ] "=" expression ";" . FIRST: "set"
+			elif self.consume("SET", None):
+				line = self.line()
+				target = self.consume("ID", "identifier")[1]
+				index = self.index(currScope) if self.sym[0] == "LBRACKET" else None
+				self.consume("ASSIGN", "assignment")
+				stmt = node_classes.Set(self.remember(node_classes.Name(target, currScope, line)), self.expression(currScope), index)
+				self.consume("SEMI", "semicolon")
+			# -> "rpn" rpnelements ";" .               FIRST: "rpn"
+			elif self.consume("RPN", None):
+				stmt = node_classes.RPN()
+				while self.sym[0] in ["INFIXOP", "PREFIXOP", "ID"] + funcKeys + opKeys + literals:
+					self.rpnelement(currScope, stmt)
+				self.consume("SEMI", "semicolon")
+				stmt.compile()
+			# -> "return" expression ";" .             FIRST: "return"
+			elif self.consume("RETURN", None):
+				stmt = node_classes.Return(self.expression(currScope))
+				self.consume("SEMI", "semicolon")
+			else: self.error("statement (while, expression, definition, or keyword statement)")
+			stmtlist.add(stmt)
+			return stmt
+		except Panic:
+			self.synchronize(syncStatement, start)
+
+	# FIRST: = FIRST(term)
+	# FOLLOW: = FOLLOW(term)
+	def expression(self, currScope):
+		# -> term { "infixop" term } .
+		# operator precedence from lexer.precedence, all left-associative.  parsed
+		# with explicit stacks, not one recursion per operator: each Expression is
+		# a run of operators of one precedence, folded left to right
+		operands  = [self.term(currScope)]
+		operators = []
+		while self.sym[0] == "INFIXOP":
+			operator = self.consume("INFIXOP", "infix operator")[1]
+			while operators and lexer.precedence[operators[-1]] >= lexer.precedence[operator]:
+				self.reduce(operands, operators)
+			operators.append(operator)
+			operands.append(self.term(currScope))
+		while operators:
+			self.reduce(operands, operators)
+		expr = operands[0]
+		if not isinstance(expr, node_classes.Expression): expr = node_classes.Expression(expr)
+		return expr
+
+	def reduce(self, operands, operators):
+		# combine the top two operands; extend the left one if it is a run at the same precedence
+		operator = operators.pop()
+		right, left = operands.pop(), operands.pop()
+		if not isinstance(right, node_classes.Expression): right = node_classes.Expression(right)
+		if not (isinstance(left, node_classes.Expression) and
+		        lexer.precedence[left.rest[0].operator] == lexer.precedence[operator]):
+			left = node_classes.Expression(left)
+		left.append(operator, right)
+		operands.append(left)
+
+	# FIRST: '(', 'apply', 'identifier', 'literal', 'prebind', 'prefixop'
+	# FOLLOW: ')', ',', ';', '[', ']', 'infixop'
+	def term(self, currScope):
+		# -> literal               FIRST: "literal"
+		if self.sym[0] in literals: # array literals not supported: never indexable
+			type, value = self.consume(literals, "literal (int, real, string)")[:2]
+			term = node_classes.Term(node_classes.Term.LITERAL, value)
+			term.eval_type, term.eval_value = type, value # known without evaluating
+			return term
+		# -> prebinding .          FIRST: "prebind"
+		elif self.sym[0] == "PREBIND": # prebind only returns subroutines: never indexable
+			return self.prebinding(currScope)
+		# -> indexable [ index ] . FIRST: "prefixop", "apply", "identifier", "("
+		elif self.sym[0] in ["PREFIXOP", "APPLY", "ID", "LPAREN"] :
+			term = self.indexable(currScope)
+			if self.sym[0] == "LBRACKET": term.index = self.index(currScope)
+			return term
+		else: self.error("literal, prebinding, or indexable (prefix operator, function application, identifier, or left-paren)")
+
+	# FIRST: '['
+	# FOLLOW: = FOLLOW(term) + '='
+	def index(self, currScope):
+		# -> "[" subscript { "," subscript } "]" .
+		self.consume("LBRACKET", "open bracket")
+		parts = [self.subscript(currScope)]
+		while self.consume("COMMA", None):
+			parts.append(self.subscript(currScope))
+		self.consume("RBRACKET", "close bracket")
+		return parts[0] if len(parts) == 1 else node_classes.Subscripts(parts)
+
+	# FIRST: = FIRST(expression) + ':'
+	# FOLLOW: ',', ']'
+	def subscript(self, currScope):
+		# -> expression [ ":" [ expression ] ] | ":" [ expression ] .
+		start = None if self.sym[0] == "COLON" else self.expression(currScope)
+		if not self.consume("COLON", None): return start
+		stop = None if self.sym[0] in ["COMMA", "RBRACKET"] else self.expression(currScope)
+		return node_classes.Slice(start, stop)
+
+	# FIRST: '(', 'apply', 'identifier', 'prefixop'
+	# FOLLOW: = FOLLOW(term)
+	def indexable(self, currScope):
+		# -> identifier .         FIRST: "identifier"
+		if self.sym[0] == "ID": # identifier could refer to an array
+			line = self.line()
+			name = self.consume("ID", "identifier")[1]
+			return node_classes.Indexable(self.remember(node_classes.Name(name, currScope, line)))
+		# -> application .        FIRST: "apply"
+		elif self.sym[0] == "APPLY": # function could return an array
+			return self.application(currScope)
+		# -> prefixop expression . FIRST: "prefixop"
+		elif self.sym[0] == "PREFIXOP": # could "pop x" to retrieve an array from the stack
+			operator = self.consume("PREFIXOP", "prefix operator")[1]
+			return node_classes.Prefix(operator, self.expression(currScope))
+		# -> "(" expression ")" . FIRST: "("
+		elif self.consume("LPAREN", None): # expression could evaluate to an array
+			expr = self.expression(currScope)
+			self.consume("RPAREN", "close paren")
+			return node_classes.Indexable(expr)
+		else: self.error("indexable (identifier, function application, or left-paren)")
+
+	# FIRST: 'epsilon', 'typename'
+	# FOLLOW: ')'
+	def formalparams(self, subr, mandatory = False):
+		# -> [ "typename" identifier [ "," formalparams ] ] .
+		if self.sym[0] in allTypes:
+			paramType = self.consume(allTypes, None)[0]
+			paramName = self.consume("ID", "identifier")[1]
+			try:
+				subr.addParam(paramType, paramName)
+			except node_classes.ScopeError as e:
+				self.report(str(e))
+			if self.consume("COMMA", None):
+				self.formalparams(subr, True)
+		elif mandatory: # no trailing commas
+			self.error("typename")
+		return subr.formalparams
+
+	# FIRST: = FIRST(term) + '@' + 'epsilon'
+	# FOLLOW: ')'
+	def actualparams(self, currScope, target, mandatory = False):
+		# -> [ [ "@" identifier "=" ] expression [ "," actualparams ] ] .
+		if self.sym[0] in ["PREBIND", "PREFIXOP", "APPLY", "ID", "LPAREN", "ATSIGN"] + literals:
+			name = None
+			if self.consume("ATSIGN", None):
+				name = self.consume("ID", "identifier")[1]
+				self.consume("ASSIGN", "assignment")
+			target.addParam(name, self.expression(currScope))
+			if self.consume("COMMA", None):
+				self.actualparams(currScope, target, True)
+		elif mandatory: # no trailing commas
+			self.error("prebind, prefixop, application, identifier, left paren, binding (@), or literal")
+		return target.params
+
+	# FIRST: 'prebind'
+	# FOLLOW: = FOLLOW(term)
+	def prebinding(self, currScope):
+		# -> "prebind" identifier "(" actualparams ")" . 
+		self.consume("PREBIND", "prebind")
+		line = self.line()
+		name = self.consume("ID", "identifier")[1]
+		binding = node_classes.Prebinding(name, currScope)
+		binding.target.line = line
+		self.remember(binding.target)
+		self.consume("LPAREN", "open paren")
+		self.actualparams(currScope, binding)
+		self.consume("RPAREN", "close paren")
+		return binding
+
+	# FIRST: 'cond'
+	# FOLLOW: = FOLLOW(statement)
+	def cond(self, currScope):
+		# -> "cond" "{" { ( expression ) block } "}" .        
+		self.consume("COND", "cond")
+		self.consume("LBRACE", "open brace")
+		stmt = node_classes.Cond()
+		while self.consume("LPAREN", None):
+			test = self.expression(currScope)
+			self.consume("RPAREN", "close paren")
+			stmt.append(test, self.block(currScope, node_classes.Block()))
+		self.consume("RBRACE", "close brace")
+		return stmt
+
+	# FIRST: 'while'
+	# FOLLOW: = FOLLOW(statement)
+	def while_s(self, currScope):
+		# -> "while" "(" expression ")" block
+		self.consume("WHILE", "while")
+		self.consume("LPAREN", "open paren")
+		test = self.expression(currScope)
+		self.consume("RPAREN", "close paren") 
+		return node_classes.While(test, self.block(currScope, node_classes.Block()))
+
+	# FIRST: 'fnkw', 'identifier', 'infixop', 'literal', 'opkw', 'prefixop'
+	# FOLLOW: = FIRST(rpnelement) + ';'
+	def rpnelement(self, currScope, rpn):
+		# -> identifier .
+		if self.sym[0] == "ID":
+			line = self.line()
+			name = self.consume("ID", None)[1]
+			rpn.append(node_classes.RPN.VAR, self.remember(node_classes.Name(name, currScope, line)))
+		# -> infixop .
+		elif self.sym[0] == "INFIXOP":
+			operator = self.consume("INFIXOP", None)[1]
+			rpn.append(node_classes.RPN.INFIX, operator)
+		# -> prefixop .
+		elif self.sym[0] == "PREFIXOP":
+			operator = self.consume("PREFIXOP", None)[1]
+			rpn.append(node_classes.RPN.PREFIX, operator)
+		# -> fnkw .
+		elif self.sym[0] in funcKeys:
+			function = self.consume(funcKeys, None)[0].lower()
+			rpn.append(node_classes.RPN.FNKW, function)
+		# -> opkw .
+		elif self.sym[0] in opKeys:
+			operator = self.consume(opKeys, None)[0].lower()
+			rpn.append(node_classes.RPN.OPKW, operator)
+		# -> literal .
+		elif self.sym[0] in literals:
+			type, value = self.consume(literals, None)[:2]
+			rpn.append(node_classes.RPN.LITERAL, value)
+		else: self.error("operator, function, variable, or literal value")
+		return rpn
+
+	# FIRST: 'call', 'tcall'
+	# FOLLOW: = FOLLOW(statement)
+	def call(self, currScope):
+		# -> ( "call" | "tcall" ) ( identifier | prockw )  "(" actualparams ")" .
+		tail = self.consume(["CALL", "TCALL"], "call or tail-call")[0] == "TCALL"
+		line = self.line()
+		if self.sym[0] == "ID":
+			name = self.consume("ID", "identifier")[1]
+		elif self.sym[0] in procKeys:
+			name = self.consume(procKeys, None)[0].lower()
+		else: self.error("identifier or procedure keyword")
+		stmt = node_classes.Call(name, currScope, tail, line)
+		if name not in runtime.procedures: stmt.callee = self.remember(node_classes.Name(name, currScope, line))
+		self.consume("LPAREN", "open paren")
+		self.actualparams(currScope, stmt)
+		self.consume("RPAREN", "close paren")
+		return stmt
+
+	# FIRST: 'apply'
+	# FOLLOW: = FOLLOW(term)
+	def application(self, currScope):
+		# -> "apply" ( fnkw | "array" | "matrix" | identifier )  "(" actualparams ")" .
+		self.consume("APPLY", "apply")
+		line = self.line()
+		if self.sym[0] == "ID":
+			name = self.consume("ID", "identifier")[1]
+		elif self.sym[0] in funcKeys + ctorKeys:
+			name = self.consume(funcKeys + ctorKeys, None)[0].lower()
+		else: self.error("identifier or function keyword")
+		term = node_classes.Apply(name, currScope, line)
+		if name not in runtime.functions: term.callee = self.remember(node_classes.Name(name, currScope, line))
+		self.consume("LPAREN", "open paren")
+		self.actualparams(currScope, term)
+		self.consume("RPAREN", "close paren")
+		return term
+
+
+## Library Entry Points ##
+# module-level so they can be handed straight to a thread or process pool
+
+def parse_string(text):
+	return Parser().parse_string(text)
+
+def parse_file(path):
+	return Parser().parse_file(path)
+
+def parse_stream(stream):
+	return Parser().parse_stream(stream)
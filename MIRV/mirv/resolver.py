@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+from . import runtime
+from .node_classes import Name, Expression, Indexable, Apply, Prefix, Prebinding, Slice, Subscripts
+from .node_classes import Block, Variable, Procedure, Cond, While, Set, Call, Return, RPN, walkBlocks
+from .diagnostics import Diagnostic
+
+## Resolver ##
+# One pass over a freshly parsed Program that binds every identifier to its
+# definition -- a (depth, slot) pair for variables and parameters, the
+# Procedure itself for subroutines -- including the Name behind each call.
+# After it, nothing at runtime looks a name up by string.  References that
+# don't resolve are reported here, with the rest of the compile errors.
+
+def resolve(program):
+	# the Diagnostics found; empty when every name is bound
+	return resolvePiece(program.block, program.scope.definitions.values())
+
+def resolvePiece(block, definitions):
+	resolver = Resolver()
+	for sub, body in walkBlocks(block, definitions):
+		resolver.block(body)
+	return resolver.errors
+
+class Resolver:
+	def __init__(self):
+		self.errors = [] # Diagnostic
+
+	def report(self, message, line = None):
+		self.errors.append(Diagnostic(message, line))
+
+	def name(self, name):
+		defn = name.resolve()
+		if defn is None:
+			self.report("undefined name \"" + name.name + "\"", name.line)
+			return None
+		name.bind()
+		return defn
+
+	def site(self, site, builtins):
+		# a Call or Apply: a builtin keyword, or a subroutine reached through a Name
+		for param in site.params:
+			self.expression(param.expr)
+		# builtins are left for invoke() to pick up: functions don't pickle, and the cache pickles this tree
+		if site.callee is None and site.name not in builtins: site.callee = Name(site.name, site.scope)
+		if isinstance(site.callee, Name):
+			self.name(site.callee)
+		elif any(param.name is not None for param in site.params):
+			self.report(site.name + "() takes no named parameters", site.line)
+
+	## Statements ##
+
+	def block(self, block):
+		for stmt in block.statements:
+			self.statement(stmt)
+
+	def statement(self, stmt):
+		if isinstance(stmt, Variable):
+			self.expression(stmt.init)
+		elif isinstance(stmt, Set):
+			self.expression(stmt.rvalue)
+			if stmt.index is not None: self.index(stmt.index)
+			if isinstance(self.name(stmt.lvalue), Procedure):
+				self.report("cannot set \"" + stmt.lvalue.name + "\": it is a subroutine", stmt.lvalue.line)
+		elif isinstance(stmt, Return):
+			self.expression(stmt.expr)
+		elif isinstance(stmt, Call):
+			self.site(stmt, runtime.procedures)
+		elif isinstance(stmt, Expression):
+			self.expression(stmt)
+		elif isinstance(stmt, Cond):
+			for elem in stmt.conds:
+				self.expression(elem.cond)
+				self.block(elem.block)
+		elif isinstance(stmt, While):
+			self.expression(stmt.cond)
+			self.block(stmt.block)
+		elif isinstance(stmt, RPN):
+			for atom in stmt.atoms:
+				if atom.type == RPN.VAR: self.name(atom.content)
+		elif isinstance(stmt, Block):
+			self.block(stmt)
+
+	## Expressions ##
+
+	def expression(self, expr):
+		self.term(expr.term)
+		for elem in expr.rest:
+			self.expression(elem.rest)
+
+	def term(self, term):
+		if isinstance(term, Expression): # a tighter-binding run, in term position
+			self.expression(term)
+		elif isinstance(term, Prebinding):
+			for param in term.params:
+				self.expression(param.expr)
+			self.name(term.target)
+		elif isinstance(term, Indexable):
+			if isinstance(term, Apply):    self.site(term, runtime.functions)
+			elif isinstance(term, Prefix): self.expression(term.expr)
+			elif isinstance(term.value, Name): self.name(term.value)
+			else: self.expression(term.value) # parens
+			if term.index is not None: self.index(term.index)
+
+	def index(self, index):
+		if isinstance(index, Subscripts):
+			for part in index.parts:
+				self.index(part)
+		elif isinstance(index, Slice):
+			if index.start is not None: self.expression(index.start)
+			if index.stop is not None:  self.expression(index.stop)
+		else:
+			self.expression(index)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+import math, operator, sys
+
+## Runtime Support ##
+# Frames, the per-robot Machine, and the operator/builtin tables that the
+# node_classes execute/evaluate methods dispatch through.
+
+class ExecutionError(Exception):
+	pass
+
+class Frame:
+	# one activation: a fixed-size slot list, reused across calls (see Procedure.acquire)
+	def __init__(self, owner, size):
+		self.owner   = owner          # Procedure or Program whose variables live here
+		self.slots   = [None] * size  # Value, indexed by Variable.slot / FormalParam.slot
+		self.parent  = None           # Frame of the lexically enclosing owner (static link)
+		self.machine = None           # Machine, for the data stack
+		self.result  = None           # Value, set by "return"
+		self.tail    = None           # (Procedure, names, values), set by "tcall"
+		self.captured = False         # a Closure links to it: never reused (see Procedure.capture)
+
+class DataStack(object):
+	# a robot's data stack for push/pop/peek/load/store: capacity slots allocated
+	# up front, the values in slots[:top], bottom first.  It never grows; pushing
+	# past capacity is an error, the way popping an empty one is
+	__slots__ = ('slots', 'top')
+	def __init__(self, capacity):
+		self.slots = [None] * capacity
+		self.top   = 0
+	def push(self, value):
+		if self.top == len(self.slots): raise ExecutionError("stack overflow: capacity is " + str(len(self.slots)))
+		self.slots[self.top] = value
+		self.top += 1
+	def extend(self, values):
+		top = self.top
+		if top + len(values) > len(self.slots): raise ExecutionError("stack overflow: capacity is " + str(len(self.slots)))
+		self.slots[top:top + len(values)] = values
+		self.top = top + len(values)
+	def pop(self):
+		if not self.top: raise ExecutionError("stack underflow")
+		self.top -= 1
+		value, self.slots[self.top] = self.slots[self.top], None # no reference left behind
+		return value
+	def peek(self, n = 0):
+		# the nth value from the top
+		if not 0 <= n < self.top: raise ExecutionError("stack underflow")
+		return self.slots[self.top - 1 - n]
+	def __len__(self):
+		return self.top
+	def __iter__(self):
+		return iter(self.slots[:self.top])
+	def __repr__(self):
+		return repr(self.slots[:self.top])
+
+class Machine:
+	# everything one robot owns at runtime; the Program itself is shared and read-only
+	def __init__(self, program, capacity = None):
+		if numpy is None and "numpy" in sys.modules: needNumpy("an array") # arrays may come from outside: a cached program, run()'s values
+		if sys.getrecursionlimit() < RECURSION_LIMIT: sys.setrecursionlimit(RECURSION_LIMIT)
+		self.program = program
+		self.stack   = DataStack(capacity or STACK_CAPACITY) # data stack for push/pop/peek/load/store
+		self.globals = Frame(program, program.frameSize)
+		self.globals.machine = self
+		self.loop    = None                                 # the _loop_ Procedure, found on the first tick
+		self.nesting = 0                                    # frames in use: MIRV calls in progress
+	def start(self):
+		# initialize globals in source order, then run _init_ if there is one
+		self.initialize()
+		return self.run(INIT_PROC, optional = True)
+	def tick(self):
+		if self.loop is None:
+			self.loop = self.program.scope.lookup(LOOP_PROC)
+			if self.loop is None: raise ExecutionError("no " + LOOP_PROC + "() procedure found")
+		return self.call(self.loop, [])
+	def run(self, name, values = (), optional = False):
+		proc = self.program.scope.lookup(name)
+		if proc is None:
+			if optional: return None
+			raise ExecutionError("no " + name + "() procedure found")
+		return self.call(proc, list(values))
+	## engine hooks: how globals get initialized and a subroutine gets run ##
+	def initialize(self):
+		self.program.block.execute(self.globals)
+	def call(self, proc, values):
+		return proc.call(self.globals, values)
+
+INIT_PROC  = "_init_"
+LOOP_PROC  = "_loop_"
+STACK_CAPACITY = 1024 # data stack values per robot, unless the Machine is given a capacity
+MAX_NESTING = 500 # MIRV calls in progress per robot; deeper is an ExecutionError, not a crash
+RECURSION_LIMIT = 10000 # Python frames: the tree walker takes a dozen or more per MIRV call
+
+## Values ##
+
+def truth(value):
+	if isinstance(value, ndarray): raise ExecutionError("an array is neither true nor false")
+	return bool(value)
+
+def widen(type, value):
+	# ints stored into REAL variables become reals; everything else is stored as-is
+	if type == "REAL" and isinstance(value, (int, long)): return float(value)
+	return value
+
+def index(value, idx):
+	# idx is an int, or for arrays a slice or a tuple of them (see node_classes.Slice)
+	if not isinstance(idx, (int, long, slice, tuple)): raise ExecutionError("index must be an integer, got " + repr(idx))
+	try:
+		elem = value[idx]
+	except (IndexError, TypeError, ValueError) as e:
+		raise ExecutionError("cannot index " + repr(value) + " with " + repr(idx))
+	if isinstance(elem, scalar): return elem.item() # a plain float out of an ARRAY, like any other REAL
+	return elem # a MATRIX row is an ARRAY
+
+## Operators ##
+
+def divide(a, b):
+	try:
+		return operator.div(a, b)
+	except ZeroDivisionError:
+		raise ExecutionError("division by zero")
+
+def modulo(a, b):
+	try:
+		return a % b
+	except ZeroDivisionError:
+		raise ExecutionError("modulo by zero")
+
+infixops = {
+	'PLUS':  operator.add, 'MINUS': operator.sub, 'TIMES': operator.mul, 'DIV': divide, 'MOD': modulo,
+	'LT':  lambda a, b: int(a <  b), 'LTE': lambda a, b: int(a <= b), 'EQ': lambda a, b: int(a == b),
+	'GTE': lambda a, b: int(a >= b), 'GT':  lambda a, b: int(a >  b),
+	'SHL': operator.lshift, 'SHR': operator.rshift, 'BAND': operator.and_, 'BOR': operator.or_, 'BXOR': operator.xor,
+}
+
+prefixops = {
+	'INCR': lambda a: a + 1, 'DECR': lambda a: a - 1, 'BNOT': operator.invert,
+}
+
+opkws = { # rpn only: name -> (arity, function)
+	'and': (2, lambda a, b: int(truth(a) and truth(b))),
+	'or':  (2, lambda a, b: int(truth(a) or truth(b))),
+	'not': (1, lambda a: int(not truth(a))),
+}
+
+def infix(op, a, b):
+	if isinstance(a, ndarray) or isinstance(b, ndarray): return elementwise(op, a, b)
+	try:
+		return infixops[op](a, b)
+	except TypeError:
+		raise ExecutionError("operator " + op + " not defined for " + repr(a) + " and " + repr(b))
+	except (ValueError, OverflowError) as e: # e.g. a negative shift count
+		raise ExecutionError("operator " + op + " failed on " + repr(a) + " and " + repr(b) + ": " + str(e))
+
+def checked(op):
+	# the handler for operands of unknown type: dispatch through infix, which reports misuse
+	return lambda a, b: infix(op, a, b)
+
+dynamicops = dict((op, checked(op)) for op in infixops)
+
+def handler(op, typed):
+	# typed: both operands statically INT or REAL (see typechecker), so the bare operator is safe
+	return infixops[op] if typed else dynamicops[op]
+
+def prefix(op, a):
+	try:
+		return prefixops[op](a)
+	except TypeError:
+		raise ExecutionError("operator " + op + " not defined for " + repr(a))
+	except (ValueError, OverflowError) as e:
+		raise ExecutionError("operator " + op + " failed on " + repr(a) + ": " + str(e))
+
+## Arrays ##
+# ARRAY and MATRIX values are NumPy arrays of reals, 1-d and 2-d.  Infix
+# operators with an array on either side apply to every element at once
+# (a number on the other side is broadcast), comparisons give arrays of
+# 1.0/0.0, and the math builtins take arrays too -- so a bot scores a whole
+# board in one expression instead of a while loop.  Arrays are never true
+# or false: a condition has to reduce one to a number first.
+
+# NumPy is imported by needNumpy() the first time an array is built: it
+# costs more than the rest of startup put together, and most robots never
+# touch it.  Until then nothing can be an array, and the placeholders say so.
+
+numpy    = None # the module, once loaded; ARRAY and MATRIX values need it, everything else runs without
+ndarray  = ()   # isinstance(x, ()) is always False
+scalar   = ()
+arrayops = {}
+
+def numeric(value):
+	return isinstance(value, (int, long, float, ndarray))
+
+def vectorized(fn, *args):
+	# a NumPy ufunc over arrays; where NumPy would only print a warning, this raises
+	try:
+		with numpy.errstate(divide = 'raise', invalid = 'raise', over = 'raise'):
+			return numpy.asarray(fn(*args), dtype = float)
+	except FloatingPointError as e: # e.g. divide by zero, sqrt of a negative, overflow
+		raise ExecutionError(str(e))
+	except ValueError as e: # shapes that don't broadcast
+		raise ExecutionError(str(e))
+
+def elementwise(op, a, b):
+	fn = arrayops.get(op)
+	if fn is None or not (numeric(a) and numeric(b)):
+		raise ExecutionError("operator " + op + " not defined for " + repr(a) + " and " + repr(b))
+	return vectorized(fn, a, b)
+
+def setIndex(slots, slot, key, value):
+	# slots[slot][key] = value for an array.  Copy on write: an array that is a
+	# view, or that anything else can still see (another variable, the stack,
+	# a view into it), is copied into the slot first, so no one else's value
+	# changes.  The references expected are the slot, arr and getrefcount's own
+	arr = slots[slot]
+	if not isinstance(arr, ndarray): raise ExecutionError("can only set elements of an ARRAY or MATRIX, not " + repr(arr))
+	if arr.base is not None or sys.getrefcount(arr) > 3: arr = slots[slot] = arr.copy()
+	if not isinstance(key, (int, long, slice, tuple)): raise ExecutionError("index must be an integer, got " + repr(key))
+	if not numeric(value): raise ExecutionError("cannot store " + repr(value) + " in an array")
+	try:
+		arr[key] = value
+	except (IndexError, TypeError, ValueError) as e:
+		raise ExecutionError("cannot set " + repr(key) + " of an array: " + str(e))
+
+def needNumpy(what):
+	global numpy, ndarray, scalar
+	if numpy is not None: return
+	try:
+		import numpy as module
+	except ImportError:
+		raise ExecutionError(what + " needs NumPy, which isn't installed")
+	arrayops.update({
+		'PLUS': module.add,  'MINUS': module.subtract,   'TIMES': module.multiply, 'DIV': module.true_divide, 'MOD': module.mod,
+		'LT':   module.less, 'LTE':   module.less_equal, 'EQ':    module.equal,
+		'GTE':  module.greater_equal, 'GT': module.greater,
+	})
+	numpy, ndarray, scalar = module, module.ndarray, module.generic
+
+## Builtins ##
+# each takes the Machine and a list of argument values.
+# stack words: push(v...) pushes in order; pop() removes and returns the top;
+# peek([n]) returns the nth value from the top; load([n]) pushes a copy of it;
+# store(v) pushes v and also returns it.
+# array(v...) and matrix(rows, cols [, fill]) build ARRAY and MATRIX values.
+
+class Math1(object):
+	# a one-argument math builtin.  A class rather than a closure so it pickles,
+	# like the other builtins, along with the call sites that have cached it
+	__slots__ = ('fn', 'ufunc')
+	def __init__(self, fn, ufunc):
+		self.fn    = fn    # for a number
+		self.ufunc = ufunc # name of the NumPy version, for an ARRAY or MATRIX argument
+	def __call__(self, machine, args):
+		if len(args) != 1: raise ExecutionError("expected 1 argument, got " + str(len(args)))
+		if isinstance(args[0], ndarray): return vectorized(getattr(numpy, self.ufunc), args[0])
+		try:
+			return self.fn(args[0])
+		except (ValueError, TypeError) as e:
+			raise ExecutionError(str(e))
+
+def atan2(machine, args):
+	if len(args) != 2: raise ExecutionError("atan2 expects 2 arguments, got " + str(len(args)))
+	if isinstance(args[0], ndarray) or isinstance(args[1], ndarray): return vectorized(numpy.arctan2, args[0], args[1])
+	return math.atan2(args[0], args[1])
+
+def array(machine, args):
+	# array(v...): the values in order, as an ARRAY; arrays among them are spliced in (matrices flattened)
+	needNumpy("array()")
+	for arg in args:
+		if not numeric(arg): raise ExecutionError("array() takes numbers and arrays, got " + repr(arg))
+	if not args: return numpy.zeros(0)
+	return numpy.concatenate([numpy.ravel(arg) for arg in args]).astype(float)
+
+def matrix(machine, args):
+	# matrix(rows, cols [, fill]): a rows x cols MATRIX, every element fill (default 0)
+	needNumpy("matrix()")
+	if len(args) not in (2, 3): raise ExecutionError("matrix expects 2 or 3 arguments, got " + str(len(args)))
+	for size in args[:2]:
+		if not isinstance(size, (int, long)) or size < 0: raise ExecutionError("matrix size must be a non-negative integer, got " + repr(size))
+	fill = args[2] if len(args) == 3 else 0
+	if not numeric(fill) or isinstance(fill, ndarray): raise ExecutionError("matrix fill must be a number, got " + repr(fill))
+	return numpy.full((args[0], args[1]), fill, dtype = float)
+
+def push(machine, args):
+	machine.stack.extend(args)
+
+def pop(machine, args):
+	return machine.stack.pop()
+
+def peek(machine, args):
+	return machine.stack.peek(args[0] if args else 0)
+
+def load(machine, args):
+	machine.stack.push(machine.stack.peek(args[0] if args else 0))
+
+def store(machine, args):
+	if len(args) != 1: raise ExecutionError("store expects 1 argument, got " + str(len(args)))
+	machine.stack.push(args[0])
+	return args[0]
+
+functions = {
+	'sin':  Math1(math.sin,  'sin'),    'cos':  Math1(math.cos,  'cos'),    'tan':  Math1(math.tan,  'tan'),  'sqrt':  Math1(math.sqrt, 'sqrt'),
+	'asin': Math1(math.asin, 'arcsin'), 'acos': Math1(math.acos, 'arccos'), 'atan': Math1(math.atan, 'arctan'), 'atan2': atan2,
+	'peek': peek,                       'pop':  pop,                        'store': store,
+	'array': array,                     'matrix': matrix,
+}
+
+pure = set(['sin', 'cos', 'tan', 'sqrt', 'asin', 'acos', 'atan', 'atan2']) # no machine state: safe to fold at compile time
+
+arities = { # how many values a function keyword takes off the stack inside rpn
+	'sin': 1, 'cos': 1, 'tan': 1, 'sqrt': 1, 'asin': 1, 'acos': 1, 'atan': 1, 'atan2': 2,
+	'peek': 0, 'pop': 0, 'store': 1,
+}
+
+stackEffects = { # builtins that work on the data stack themselves: (values they need there, net change)
+	'pop': (1, -1), 'peek': (1, 0), 'store': (0, 1),
+}
+
+procedures = {
+	'push': push, 'load': load,
+}
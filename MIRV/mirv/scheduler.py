@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+import multiprocessing
+from . import runtime
+from .runtime import ExecutionError, LOOP_PROC
+
+## Scheduler ##
+# Runs a whole arena of robots a tick at a time.  A robot that fails is
+# halted and its error kept, instead of stopping everybody else, and with
+# an instruction budget (BytecodeMachine's budget option) one that runs
+# long is suspended and picks up where it left off on the next tick.
+# With processes > 1 the robots are dealt out to that many worker
+# processes, each of which keeps its own robots (and their state) for the
+# life of the Scheduler; every tick runs on all workers at once.
+
+def failure(e):
+	# the message a robot halts with.  Anything it raises halts only that robot,
+	# MemoryError and Python's own recursion limit included
+	if isinstance(e, ExecutionError): return str(e)
+	return "%s: %s" % (type(e).__name__, e)
+
+class Batch:
+	# some robots, all in this process
+	def __init__(self, programs, engine = runtime.Machine, options = {}):
+		self.machines = [engine(program, **options) for program in programs]
+		self.errors   = [None] * len(self.machines) # message once a robot has halted
+	def start(self):
+		for i, machine in enumerate(self.machines):
+			try:
+				machine.start()
+				if machine.program.scope.lookup(LOOP_PROC) is None: raise ExecutionError("no " + LOOP_PROC + "() procedure found")
+			except Exception as e:
+				self.errors[i] = failure(e)
+		return self.errors
+	def tick(self, ticks = 1):
+		machines, errors = self.machines, self.errors
+		for tick in xrange(ticks):
+			for i in xrange(len(machines)):
+				if errors[i] is not None: continue
+				try:
+					machines[i].tick()
+				except Exception as e:
+					errors[i] = failure(e)
+		return errors
+	def snapshot(self):
+		# (global slots, data stack) per robot
+		return [(list(machine.globals.slots), list(machine.stack)) for machine in self.machines]
+
+def serve(conn, programs, engine, options):
+	# worker process: a Batch, driven by (method, args) requests until "close"
+	batch = Batch(programs, engine, options)
+	while True:
+		method, args = conn.recv()
+		if method == "close": break
+		try:
+			conn.send((True, getattr(batch, method)(*args)))
+		except Exception as e:
+			conn.send((False, failure(e)))
+	conn.close()
+
+class Scheduler:
+	def __init__(self, programs, engine = runtime.Machine, processes = None, **options):
+		# options go to every engine(program, ...), e.g. budget = 10000 for a BytecodeMachine
+		self.count   = len(programs)
+		self.batch   = None # in-process Batch, when there are no workers
+		self.workers = []   # (Process, Connection, robot indices)
+		if not processes or processes <= 1 or self.count <= 1:
+			self.batch = Batch(programs, engine, options)
+			return
+		for w in xrange(min(processes, self.count)):
+			indices = range(w, self.count, processes) # dealt round-robin
+			parent, child = multiprocessing.Pipe()
+			worker = multiprocessing.Process(target = serve, args = (child, [programs[i] for i in indices], engine, options))
+			worker.daemon = True
+			worker.start()
+			child.close()
+			self.workers.append((worker, parent, indices))
+	def request(self, method, *args):
+		# one result per robot, in robot order
+		if self.batch is not None: return getattr(self.batch, method)(*args)
+		for worker, conn, indices in self.workers: # all workers run at once...
+			conn.send((method, args))
+		results = [None] * self.count
+		for worker, conn, indices in self.workers: # ...then collect
+			ok, value = conn.recv()
+			if not ok: raise RuntimeError("scheduler worker failed: " + value)
+			for i, result in zip(indices, value):
+				results[i] = result
+		return results
+	def start(self):
+		# run every robot's _init_; returns the errors so far, None for robots still running
+		return self.request("start")
+	def tick(self, ticks = 1):
+		return self.request("tick", ticks)
+	def snapshot(self):
+		return self.request("snapshot")
+	def close(self):
+		for worker, conn, indices in self.workers:
+			conn.send(("close", ()))
+			conn.close()
+			worker.join()
+		self.workers = []
+	def __enter__(self):
+		return self
+	def __exit__(self, *exc):
+		self.close()
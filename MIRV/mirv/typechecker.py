@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+from .node_classes import Name, Expression, Indexable, Apply, Prefix, Prebinding, Slice, Subscripts
+from .node_classes import Block, Variable, Procedure, Function, Cond, While, Set, Call, Return, walkBlocks
+from .diagnostics import Diagnostic
+
+## Type Checker ##
+# Runs after the resolver, so every Name already knows its definition.  Fills
+# in eval_type on Terms, Expressions and OpElements -- None where a value's
+# type can't be known before it runs (pop(), peek(), indexing) -- and reports
+# values that can't go where they're put: a string into a real, a real into
+# an int, arithmetic on a subroutine.  Operators whose operands are both
+# known to be INT or REAL get the bare operator as their handler, skipping
+# the dynamic check (see runtime.handler).  ARRAY and MATRIX mix with
+# numbers elementwise, and the bigger shape wins: MATRIX over ARRAY over
+# a number.
+
+NUMERIC     = ("INT", "REAL")
+ARITHMETIC  = ("PLUS", "MINUS", "TIMES", "DIV", "MOD")
+COMPARISON  = ("LT", "LTE", "EQ", "GTE", "GT")
+VECTOR      = ("ARRAY", "MATRIX")
+dimensions  = {"REAL": 0, "ARRAY": 1, "MATRIX": 2} # of an array's elements, row, or whole
+shapes      = dict((count, type) for type, count in dimensions.items())
+
+returns = { # builtin function -> result type, None when it depends on the stack
+	'sin': "REAL", 'cos': "REAL", 'tan': "REAL", 'sqrt': "REAL",
+	'asin': "REAL", 'acos': "REAL", 'atan': "REAL", 'atan2': "REAL",
+	'peek': None, 'pop': None, 'store': None, 'array': "ARRAY", 'matrix': "MATRIX",
+}
+
+def broadcast(types):
+	# the shape of an elementwise result: None when no operand is an array
+	if "MATRIX" in types: return "MATRIX"
+	if "ARRAY" in types: return "ARRAY"
+	return None
+
+def check(program):
+	# the Diagnostics found; empty when the program is well typed
+	return checkPiece(program.block, program.scope.definitions.values())
+
+def checkPiece(block, definitions):
+	checker = Checker()
+	for sub, body in walkBlocks(block, definitions):
+		checker.subroutine = sub
+		checker.block(body)
+	return checker.errors
+
+def assignable(target, value):
+	# can a value of type value be stored where target is expected?  None is "unknown": anything goes
+	if target is None or value is None or target == value: return True
+	return target == "REAL" and value == "INT" # widened on the way in
+
+def subroutineType(sub):
+	return "FUNC" if isinstance(sub, Function) else "PROC"
+
+class Checker:
+	def __init__(self):
+		self.errors     = [] # Diagnostic
+		self.subroutine = None # Procedure being checked; None for the global initializers
+		self.line       = None # line of the last Name seen, for errors in between
+
+	def report(self, message, line = None):
+		if line is None: line = self.line
+		if self.subroutine is not None: message = "in " + self.subroutine.name + "(): " + message
+		self.errors.append(Diagnostic(message, line))
+
+	def expect(self, target, value, what, line = None):
+		if not assignable(target, value):
+			self.report("cannot use a " + value + " value as " + what + " (" + target + ")", line)
+
+	## Statements ##
+
+	def block(self, block):
+		for stmt in block.statements:
+			self.statement(stmt)
+
+	def statement(self, stmt):
+		if isinstance(stmt, Variable):
+			self.expect(stmt.type, self.expression(stmt.init), "\"" + stmt.name + "\"", stmt.line)
+		elif isinstance(stmt, Set):
+			self.line = stmt.lvalue.line
+			defn = stmt.lvalue.definition
+			type = getattr(defn, "type", None)
+			value = self.expression(stmt.rvalue)
+			if stmt.index is not None:
+				type = self.index(type, stmt.index)
+				if type in VECTOR and value in NUMERIC: value = type # a number fills a whole slice
+			self.expect(type, value, "\"" + stmt.lvalue.name + "\"", stmt.lvalue.line)
+		elif isinstance(stmt, Return):
+			stmt.eval_type = self.expression(stmt.expr)
+			if isinstance(self.subroutine, Function): self.expect(self.subroutine.returnType, stmt.eval_type, "the return value")
+		elif isinstance(stmt, Call):
+			self.site(stmt, stmt.callee)
+		elif isinstance(stmt, Expression):
+			self.expression(stmt)
+		elif isinstance(stmt, Cond):
+			for elem in stmt.conds:
+				self.condition(elem.cond)
+				self.block(elem.block)
+		elif isinstance(stmt, While):
+			self.condition(stmt.cond)
+			self.block(stmt.block)
+		elif isinstance(stmt, Block):
+			self.block(stmt)
+
+	def condition(self, expr):
+		type = self.expression(expr)
+		if type in VECTOR: self.report("a condition can't be an " + type + ": arrays are neither true nor false")
+
+	def site(self, site, callee):
+		# argument types against the callee's formal params, when the callee is known now
+		if isinstance(callee, Name) and callee.line is not None: self.line = callee.line
+		types = [self.expression(param.expr) for param in site.params]
+		if not isinstance(callee, Name) or not isinstance(callee.definition, Procedure): return None
+		sub = callee.definition
+		unbound = list(sub.formalparams)
+		for param, type in zip(site.params, types):
+			if param.name is None:
+				if not unbound:
+					self.report("too many parameters for " + sub.name + "()", callee.line)
+					break
+				formal = unbound.pop(0)
+			else:
+				for formal in unbound:
+					if formal.name == param.name: break
+				else:
+					self.report(sub.name + "() has no parameter \"" + param.name + "\"", callee.line)
+					continue
+				unbound.remove(formal)
+			self.expect(formal.type, type, "parameter \"" + formal.name + "\" of " + sub.name + "()", callee.line)
+		return getattr(sub, "returnType", None)
+
+	## Expressions ##
+
+	def expression(self, expr):
+		type = self.term(expr.term)
+		for elem in expr.rest:
+			right = self.expression(elem.rest)
+			elem.setTyped(type in NUMERIC and right in NUMERIC)
+			type = elem.eval_type = self.infix(elem.operator, type, right)
+		expr.eval_type = type
+		return type
+
+	def infix(self, op, left, right):
+		vector = broadcast((left, right))
+		if vector is not None and op in ARITHMETIC + COMPARISON and left in NUMERIC + VECTOR + (None,) and right in NUMERIC + VECTOR + (None,):
+			return vector # elementwise
+		if op in COMPARISON and vector is None: return "INT"
+		if left is None or right is None: return None
+		if op in ARITHMETIC:
+			if left in NUMERIC and right in NUMERIC: return "REAL" if "REAL" in (left, right) else "INT"
+			if left == right == "STRING" and op == "PLUS": return "STRING"
+			if op == "TIMES" and sorted((left, right)) == ["INT", "STRING"]: return "STRING"
+		elif left == right == "INT": # bitwise
+			return "INT"
+		self.report("operator " + op + " not defined for " + left + " and " + right)
+		return None
+
+	def term(self, term):
+		if isinstance(term, Expression): # a tighter-binding run, in term position
+			return self.expression(term)
+		if isinstance(term, Prebinding):
+			self.site(term, term.target)
+			type = subroutineType(term.target.definition) if isinstance(term.target.definition, Procedure) else None
+		elif isinstance(term, Apply):
+			if isinstance(term.callee, Name):
+				type = self.site(term, term.callee)
+			else:
+				types = [self.expression(param.expr) for param in term.params]
+				type = returns.get(term.name)
+				if term.name == 'store' and types: type = types[0]
+				elif type == "REAL" and broadcast(types): type = broadcast(types) # math on arrays is elementwise
+		elif isinstance(term, Prefix):
+			type = self.expression(term.expr)
+			if type in VECTOR and term.operator != 'BNOT': pass # ++ and -- go elementwise
+			elif type is not None and (type not in NUMERIC or (term.operator == 'BNOT' and type != "INT")):
+				self.report("operator " + term.operator + " not defined for " + type)
+				type = None
+		elif isinstance(term, Indexable):
+			if isinstance(term.value, Name):
+				if term.value.line is not None: self.line = term.value.line
+				defn = term.value.definition
+				type = subroutineType(defn) if isinstance(defn, Procedure) else getattr(defn, "type", None)
+			else:
+				type = self.expression(term.value) # parens
+		else:
+			return term.eval_type # literal: set by the parser
+		if isinstance(term, Indexable) and term.index is not None:
+			type = self.index(type, term.index)
+		term.eval_type = type
+		return type
+
+	def index(self, type, index):
+		# the type of value[index]: element types are only known for arrays
+		parts = index.parts if isinstance(index, Subscripts) else [index]
+		for part in parts:
+			for expr in ((part.start, part.stop) if isinstance(part, Slice) else (part,)):
+				if expr is not None: self.expect("INT", self.expression(expr), "an index")
+		if type not in VECTOR: return None
+		if len(parts) > dimensions[type]:
+			self.report("too many subscripts for " + type)
+			return None
+		return shapes[dimensions[type] - len([part for part in parts if not isinstance(part, Slice)])] # each int drops one